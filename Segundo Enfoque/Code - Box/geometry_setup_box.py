@@ -8,10 +8,58 @@ Proyecto: Modelado térmico de biorreactores para fermentación de cacao
 import numpy as np
 from mpi4py import MPI
 from dolfinx import mesh, fem, plot
-from dolfinx.mesh import create_box, CellType, locate_entities_boundary, meshtags
+from dolfinx.mesh import create_box, CellType, meshtags
 from dolfinx.fem import functionspace, Function
 import ufl
 
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Nombres de los marcadores de frontera (para el resumen de mark_boundaries)
+_MARKER_NAMES = {
+    1: "Izquierda normal", 2: "Derecha normal", 3: "Frente", 4: "Atrás",
+    5: "Inferior normal", 6: "Superior",
+    7: "Inferior VENTILADO", 8: "Izquierda VENTILADA", 9: "Derecha VENTILADA"
+}
+
+
+def make_classifier(thickness, L_ext, W_ext, H_cacao):
+    """
+    Crea un clasificador de celdas (1 = madera, 2 = cacao) especializado
+    para una geometría: los límites quedan fijos como constantes del kernel
+    """
+    x_lo = y_lo = z_lo = thickness
+    x_hi = L_ext - thickness
+    y_hi = W_ext - thickness
+    z_hi = H_cacao + thickness
+    
+    if not NUMBA_AVAILABLE:
+        def classify(midpoints, out):
+            """Escribe el marcador de cada punto medio en out (NumPy)"""
+            x, y, z = midpoints[:, 0], midpoints[:, 1], midpoints[:, 2]
+            inside = ((x > x_lo) & (x < x_hi) & (y > y_lo) & (y < y_hi) &
+                      (z > z_lo) & (z < z_hi))
+            out[:] = np.where(inside, 2, 1)
+        return classify
+    
+    @njit
+    def classify(midpoints, out):
+        """Escribe el marcador de cada punto medio en out"""
+        for i in range(midpoints.shape[0]):
+            x = midpoints[i, 0]
+            y = midpoints[i, 1]
+            z = midpoints[i, 2]
+            if x_lo < x < x_hi and y_lo < y < y_hi and z_lo < z < z_hi:
+                out[i] = 2  # Cacao
+            else:
+                out[i] = 1  # Madera
+    return classify
+
+
 class BioreactorGeometry:
     """
     Clase para crear y gestionar la geometría del biorreactor
@@ -36,6 +84,12 @@ class BioreactorGeometry:
         # Inicializar MPI
         self.comm = MPI.COMM_WORLD
         
+        # Generador con semilla fija: selección reproducible de facetas ventiladas
+        self._rng = np.random.default_rng(0)
+        
+        # Clasificador de celdas especializado para esta geometría (se crea al primer uso)
+        self._classifier = None
+        
     def _setup_box_dimensions(self):
         """
         Configura las dimensiones para la caja biorreactor
@@ -167,26 +221,22 @@ class BioreactorGeometry:
         num_cells = self.domain.topology.index_map(tdim).size_local
         midpoints = mesh.compute_midpoints(self.domain, tdim, np.arange(num_cells, dtype=np.int32))
         
-        # Marcar celdas: 1 = madera, 2 = cacao
-        markers = np.zeros(num_cells, dtype=np.int32)
-        
-        for i, point in enumerate(midpoints):
-            x, y, z = point
-            
-            # Verificar si está en el interior (cacao)
-            if (self.thickness < x < self.L_ext - self.thickness and
-                self.thickness < y < self.W_ext - self.thickness and
-                self.thickness < z < self.H_cacao + self.thickness):
-                markers[i] = 2  # Cacao
-            else:
-                markers[i] = 1  # Madera
+        # Marcar celdas: 1 = madera, 2 = cacao (interior)
+        if self._classifier is None:
+            self._classifier = make_classifier(self.thickness, self.L_ext,
+                                               self.W_ext, self.H_cacao)
+        markers = np.empty(num_cells, dtype=np.int32)
+        self._classifier(midpoints, markers)
         
         # Asignar marcadores
         self.material_markers.x.array[:] = markers.astype(np.float64)
         
+        # Copia entera (int32) de los valores DG0 para comparaciones sin float
+        self.material_markers_int = self.material_markers.x.array.astype(np.int32)
+        
         # Contar regiones
-        cacao_cells = np.sum(markers == 2)
-        wood_cells = np.sum(markers == 1)
+        cacao_cells = np.count_nonzero(markers == 2)
+        wood_cells = num_cells - cacao_cells
         
         print(f"✅ Regiones marcadas:")
         print(f"   - Celdas de madera: {wood_cells}")
@@ -199,103 +249,55 @@ class BioreactorGeometry:
         """
         print("🎯 Marcando fronteras (con)...")
         
-        fdim = self.domain.topology.dim - 1
-        
-        # Localizar entidades de frontera
-        def left_boundary(x):
-            return np.isclose(x[0], 0.0)
-        
-        def right_boundary(x):
-            return np.isclose(x[0], self.L_ext)
-        
-        def front_boundary(x):
-            return np.isclose(x[1], 0.0)
-        
-        def back_boundary(x):
-            return np.isclose(x[1], self.W_ext)
-        
-        def bottom_boundary(x):
-            return np.isclose(x[2], 0.0)
-        
-        def top_boundary(x):
-            return np.isclose(x[2], self.H_ext)
-        
-        # Recopilar todas las facetas e índices
-        facet_indices = []
-        facet_markers = []
-        
-        # PASO 1: Marcar fronteras normales (sin ventilación)
-        boundaries_normal = [
-            (3, front_boundary),    # Frente - sin ventilación
-            (4, back_boundary),     # Atrás - sin ventilación  
-            (6, top_boundary)       # Superior - sin ventilación
-        ]
+        tdim = self.domain.topology.dim
+        fdim = tdim - 1
+        
+        # Clasificar todas las facetas exteriores en una sola pasada por su punto medio
+        # (1 = izquierda, 2 = derecha, 3 = frente, 4 = atrás, 5 = inferior, 6 = superior)
+        self.domain.topology.create_connectivity(fdim, tdim)
+        boundary_facets = mesh.exterior_facet_indices(self.domain.topology)
+        x = mesh.compute_midpoints(self.domain, fdim, boundary_facets)
+        sides = np.select(
+            [np.isclose(x[:, 0], 0.0), np.isclose(x[:, 0], self.L_ext),
+             np.isclose(x[:, 1], 0.0), np.isclose(x[:, 1], self.W_ext),
+             np.isclose(x[:, 2], 0.0), np.isclose(x[:, 2], self.H_ext)],
+            [1, 2, 3, 4, 5, 6],
+            default=0
+        )
         
-        for (marker, boundary_func) in boundaries_normal:
-            facets = locate_entities_boundary(self.domain, fdim, boundary_func)
-            facet_indices.extend(facets)
-            facet_markers.extend([marker] * len(facets))
+        # Marcadores alineados con boundary_facets (ya ordenadas por índice):
+        # las facetas ventiladas se re-marcan en sitio, sin concatenar ni reordenar
+        # PASO 1: Fronteras normales (sin ventilación): el propio lado
+        facet_markers_all = sides.astype(np.int32)
         
-        # PASO 2: Procesar inferior con ventilación parcial
-        bottom_facets = locate_entities_boundary(self.domain, fdim, bottom_boundary)
-        if len(bottom_facets) > 0:
-            num_bottom_ventilated = max(1, int(len(bottom_facets) * self.ventilation['bottom_area_fraction']))
-            
-            # Dividir facetas del fondo
-            bottom_ventilated = bottom_facets[:num_bottom_ventilated]  # 50% ventiladas
-            bottom_normal = bottom_facets[num_bottom_ventilated:]      # 50% normales
-            
-            # Agregar a las listas
-            facet_indices.extend(bottom_normal)
-            facet_markers.extend([5] * len(bottom_normal))  # Marcador 5: inferior normal
-            
-            facet_indices.extend(bottom_ventilated)  
-            facet_markers.extend([7] * len(bottom_ventilated))  # Marcador 7: inferior ventilado
+        def ventilate(side, fraction, vent_marker):
+            """Re-marca al azar una fracción de las facetas de un lado (sin agrupar por orden de malla)"""
+            positions = np.flatnonzero(sides == side)
+            if positions.size > 0:
+                n_ventilated = max(1, int(positions.size * fraction))
+                chosen = self._rng.choice(positions, size=n_ventilated, replace=False)
+                facet_markers_all[chosen] = vent_marker
         
-        # PASO 3: Procesar izquierda con ventilación parcial
-        left_facets = locate_entities_boundary(self.domain, fdim, left_boundary)
-        if len(left_facets) > 0:
-            num_left_ventilated = max(1, int(len(left_facets) * self.ventilation['lateral_area_fraction']))
-            
-            # Dividir facetas izquierdas
-            left_ventilated = left_facets[:num_left_ventilated]  # 25% ventiladas
-            left_normal = left_facets[num_left_ventilated:]      # 75% normales
-            
-            # Agregar a las listas
-            facet_indices.extend(left_normal)
-            facet_markers.extend([1] * len(left_normal))  # Marcador 1: izquierda normal
-            
-            facet_indices.extend(left_ventilated)
-            facet_markers.extend([8] * len(left_ventilated))  # Marcador 8: izquierda ventilada
+        # PASO 2: Inferior con ventilación parcial (5 normal / 7 ventilado, 50%)
+        ventilate(5, self.ventilation['bottom_area_fraction'], 7)
         
-        # PASO 4: Procesar derecha con ventilación parcial
-        right_facets = locate_entities_boundary(self.domain, fdim, right_boundary)
-        if len(right_facets) > 0:
-            num_right_ventilated = max(1, int(len(right_facets) * self.ventilation['lateral_area_fraction']))
-            
-            # Dividir facetas derechas
-            right_ventilated = right_facets[:num_right_ventilated]  # 25% ventiladas
-            right_normal = right_facets[num_right_ventilated:]      # 75% normales
-            
-            # Agregar a las listas
-            facet_indices.extend(right_normal)
-            facet_markers.extend([2] * len(right_normal))  # Marcador 2: derecha normal
-            
-            facet_indices.extend(right_ventilated)
-            facet_markers.extend([9] * len(right_ventilated))  # Marcador 9: derecha ventilada
+        # PASO 3: Izquierda con ventilación parcial (1 normal / 8 ventilada, 25%)
+        ventilate(1, self.ventilation['lateral_area_fraction'], 8)
         
-        # Ordenar facetas por índice (requerido por FEniCSx)
-        facet_indices = np.array(facet_indices, dtype=np.int32)
-        facet_markers = np.array(facet_markers, dtype=np.int32) 
+        # PASO 4: Derecha con ventilación parcial (2 normal / 9 ventilada, 25%)
+        ventilate(2, self.ventilation['lateral_area_fraction'], 9)
         
-        sorted_facets = np.argsort(facet_indices)
+        # Solo facetas clasificadas; el orden por índice (requerido por FEniCSx) se conserva
+        classified = sides > 0
+        facet_indices = boundary_facets[classified].astype(np.int32, copy=False)
+        facet_markers = facet_markers_all[classified]
         
-        # Crear MeshTags con los índices ordenados
+        # Crear MeshTags directamente
         self.boundary_markers = meshtags(
             self.domain, 
             fdim, 
-            facet_indices[sorted_facets], 
-            facet_markers[sorted_facets]
+            facet_indices, 
+            facet_markers
         )
         
         print("✅ Fronteras marcadas con:")
@@ -308,17 +310,11 @@ class BioreactorGeometry:
         print("   8: Izquierda ventilada (25%)")  
         print("   9: Derecha ventilada (25%)")
         
-        # Verificar marcadores
-        unique_markers = np.unique(facet_markers)
-        for marker in unique_markers:
-            count = np.sum(facet_markers == marker)
-            marker_names = {
-                1: "Izquierda normal", 2: "Derecha normal", 3: "Frente", 4: "Atrás",
-                5: "Inferior normal", 6: "Superior", 
-                7: "Inferior VENTILADO", 8: "Izquierda VENTILADA", 9: "Derecha VENTILADA"
-            }
-            name = marker_names.get(marker, f"Desconocido({marker})")
-            print(f"   Marcador {marker} ({name}): {count} facetas")
+        # Verificar marcadores (todos los conteos en una sola pasada)
+        counts = np.bincount(facet_markers, minlength=10)
+        for marker in np.flatnonzero(counts):
+            name = _MARKER_NAMES.get(marker, f"Desconocido({marker})")
+            print(f"   Marcador {marker} ({name}): {counts[marker]} facetas")
         
     def get_volume_info(self):
         """
@@ -7,20 +7,65 @@ Proyecto: Modelado térmico de biorreactores para fermentación de cacao
 
 import numpy as np
 import os
+import logging
 from mpi4py import MPI
 from dolfinx import mesh, fem, io
 from dolfinx.fem import functionspace, Function, Constant, assemble_scalar
-from dolfinx.fem.petsc import LinearProblem
+from dolfinx.fem.petsc import assemble_matrix, assemble_vector, create_vector
 from dolfinx.io import XDMFFile, VTXWriter
 import ufl
 from ufl import dx, grad, dot, inner, Measure
 from petsc4py import PETSc
 from petsc4py.PETSc import ScalarType
 
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit cuando Numba no está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
 # Importar módulos del proyecto
 from geometry_setup_box import create_bioreactor_geometry
 from material_properties_box import MaterialProperties
 
+# Opciones de compilación JIT (FFCx/CFFI) para los kernels de elemento.
+# -march=native genera código para la CPU local: la caché JIT no es portable
+# entre máquinas distintas. El rendimiento del ensamblaje también depende de
+# que DOLFINx se haya compilado con optimización (no -Os).
+JIT_OPTIONS = {
+    "cffi_extra_compile_args": ["-O3", "-march=native", "-ffast-math", "-funroll-loops"],
+    "cffi_libraries": ["m"],
+}
+
+
+@njit(fastmath=True, cache=True)
+def _minmaxsum(arr):
+    """
+    Mínimo, máximo y suma del vector de temperatura en una sola pasada
+    """
+    mn = arr[0]
+    mx = arr[0]
+    total = 0.0
+    for i in range(arr.size):
+        value = arr[i]
+        total += value
+        mn = min(mn, value)
+        mx = max(mx, value)
+    return mn, mx, total
+
+
+if not NUMBA_AVAILABLE:
+    def _minmaxsum(arr):
+        """Mínimo, máximo y suma del vector de temperatura (NumPy)"""
+        return arr.min(), arr.max(), arr.sum()
+
 class BioreactorThermalModel:
     """
     Modelo térmico del biorreactor
@@ -63,9 +108,15 @@ class BioreactorThermalModel:
         # Crear funciones de propiedades
         self.props = self.mat_props.create_material_functions(
             self.domain, 
-            self.geom.material_markers
+            self.geom.material_markers,
+            markers=self.geom.material_markers_int
         )
         
+        # Los marcadores no cambian: índices del cacao (marcador = 2) calculados una vez
+        markers = self.geom.material_markers_int
+        self._cacao_mask = (markers == 2)
+        self._cacao_idx = np.flatnonzero(self._cacao_mask)
+        
         # Mostrar resumen
         self.mat_props.print_summary()
         
@@ -169,13 +220,17 @@ class BioreactorThermalModel:
         
         return a, L, dt, T_amb, h_normal, h_ventilated
     
-    def update_heat_generation_and_evaporation(self):
+    def update_heat_generation_and_evaporation(self, current_T_max, current_T_avg):
         """
         Actualiza la generación de calor Y el enfriamiento evaporativo
+        
+        current_T_max, current_T_avg: estadísticas de la temperatura actual [K]
+        (calculadas una sola vez por paso en solve_transient)
         """
-        # Obtener temperatura máxima actual
-        current_T_max = np.max(self.T.x.array)
-        current_T_avg = np.mean(self.T.x.array)
+        # Referencias locales (una sola búsqueda de atributos por llamada)
+        mp = self.mat_props
+        t = self.t
+        idx = self._cacao_idx
         
         # Actualizar máxima alcanzada
         if current_T_max > self.max_temp_reached:
@@ -183,53 +238,89 @@ class BioreactorThermalModel:
         
         # Verificar muerte microbiana
         if (not self.thermal_death_occurred and 
-            current_T_max >= self.mat_props.thermal_limits['T_death_min']):
+            current_T_max >= mp.thermal_limits['T_death_min']):
             
             self.thermal_death_occurred = True
-            self.death_time = self.t
+            self.death_time = t
             print(f"\n🦠💀 MUERTE MICROBIANA detectada!")
-            print(f"   Tiempo: {self.t/3600:.1f}h")
+            print(f"   Tiempo: {t/3600:.1f}h")
             print(f"   Temperatura máxima: {current_T_max-273.15:.1f}°C")
         
-        # Calcular enfriamiento evaporativo primero
-        q_evap_values = np.zeros_like(self.geom.material_markers.x.array)
-        
-        # Solo en el cacao (marcador = 2)
-        cacao_indices = np.where(self.geom.material_markers.x.array == 2)[0]
-        
-        for idx in cacao_indices:
-            # Usar temperatura promedio del cacao para evaporación
-            T_local = self.T.x.array[idx]
-            q_evap = self.mat_props.get_evaporative_cooling_passive(T_local, self.t)
-            q_evap_values[idx] = q_evap
+        # Calcular enfriamiento evaporativo primero: cálculo y escritura directa
+        # en el coeficiente DG0 (solo en el cacao, índices cacheados)
+        evap_sum = mp.fill_evaporative_cooling(self.T.x.array, idx,
+                                               self.q_evap_function.x.array, t)
         
         # Promedio de enfriamiento evaporativo
-        avg_evap_cooling = np.mean(q_evap_values[cacao_indices]) if len(cacao_indices) > 0 else 0
+        n_cacao = len(idx)
+        avg_evap_cooling = evap_sum / n_cacao if n_cacao > 0 else 0
         
         # Calcular generación de calor con retroalimentación
-        q_current = self.mat_props.get_fermentation_heat_profile(
-            self.t, current_T_max, avg_evap_cooling
-        )
-        
-        # Aplicar generación solo en el cacao
-        q_gen_values = np.where(self.geom.material_markers.x.array == 2, 
-                               ScalarType(q_current), ScalarType(0.0))
+        q_current = mp.get_fermentation_heat_profile(t, current_T_max, avg_evap_cooling)
         
-        # Asignar valores a las funciones
-        self.q_function.x.array[:] = q_gen_values
-        self.q_evap_function.x.array[:] = q_evap_values
+        # Aplicar generación solo en el cacao, directo en el coeficiente DG0
+        # (fuera del cacao vale 0 desde su creación y nunca se escribe)
+        self.q_function.x.array[idx] = q_current
         
         # Estimar pérdida de humedad
-        if len(cacao_indices) > 0 and avg_evap_cooling > 0:
+        if n_cacao > 0 and avg_evap_cooling > 0:
             # Aproximación: q_evap = m_evap * L_vap
-            m_evap_rate = avg_evap_cooling / self.mat_props.ventilation['L_vap']  # kg/(m³·s)
+            m_evap_rate = avg_evap_cooling / mp.ventilation['L_vap']  # kg/(m³·s)
             self.total_moisture_loss += m_evap_rate * self.dt  # kg/m³
         
         return q_current, avg_evap_cooling
     
-    def solve_transient(self, save_interval=3600):
+    def _get_solver(self, dt_value, a_form, dt_const):
+        """
+        Retorna el solver para un dt del conjunto discreto (creado al primer uso)
+        
+        A depende de dt, así que cada nivel tiene su propia matriz y su propio
+        setup de precondicionador, reutilizados en todos los pasos con ese dt.
+        """
+        if dt_value not in self._solvers:
+            dt_const.value = dt_value
+            A = assemble_matrix(a_form)
+            A.assemble()
+            
+            # Matriz SPD: CG + GAMG con setup reutilizado en todos los pasos.
+            # La estimación inicial se extrapola de las dos soluciones anteriores
+            ksp = PETSc.KSP().create(self.domain.comm)
+            ksp.setOperators(A)
+            ksp.setType(PETSc.KSP.Type.CG)
+            ksp.getPC().setType(PETSc.PC.Type.GAMG)
+            ksp.setTolerances(rtol=1e-8)
+            ksp.setInitialGuessNonzero(True)
+            ksp.setReusePreconditioner(True)
+            
+            self._solvers[dt_value] = (A, ksp)
+        return self._solvers[dt_value][1]
+    
+    def _next_dt_level(self, level, dT_max, dt_levels):
+        """
+        Ajusta el nivel de dt según el cambio de T_max del último paso
+        
+        |dT| < 0.05 K: subir un nivel; |dT| > 0.5 K: bajar un nivel.
+        Nunca se pasa de t_final (todos los niveles son múltiplos del menor).
+        """
+        if abs(dT_max) < 0.05:
+            level = min(level + 1, len(dt_levels) - 1)
+        elif abs(dT_max) > 0.5:
+            level = max(level - 1, 0)
+        
+        while level > 0 and self.t + dt_levels[level] > self.t_final:
+            level -= 1
+        return level
+    
+    def solve_transient(self, save_interval=7200, adaptive_dt=True,
+                        dt_levels=(150.0, 300.0, 600.0, 1200.0), use_vtx=False):
         """
         Resuelve el problema térmico transitorio
+        
+        Con adaptive_dt=True el paso se elige entre dt_levels [s] según la
+        variación global de T_max; cada nivel ensambla su matriz y prepara
+        su precondicionador (CG + GAMG) una sola vez.
+        Con use_vtx=True el campo se escribe con VTXWriter (ADIOS2, .bp)
+        en lugar de XDMF/HDF5.
         """
         print("\n🏃 Iniciando simulación...")
         
@@ -239,27 +330,55 @@ class BioreactorThermalModel:
         # Crear forma variacional
         a, L, dt_const, T_amb, h_normal, h_ventilated = self.create_variational_form()
         
-        # Configurar problema lineal
-        problem = LinearProblem(a, L, bcs=[], 
-                               petsc_options={"ksp_type": "preonly", 
-                                            "pc_type": "lu"})
+        # Compilar formas
+        a_form = fem.form(a, jit_options=JIT_OPTIONS)
+        L_form = fem.form(L, jit_options=JIT_OPTIONS)
+        
+        # Doble buffer de temperatura: una forma de masa por buffer, de modo que
+        # avanzar en el tiempo sea intercambiar referencias y no copiar vectores
+        L_forms = {id(self.T_n): L_form,
+                   id(self.T): fem.form(ufl.replace(L, {self.T_n: self.T}),
+                                        jit_options=JIT_OPTIONS)}
+        b = create_vector(L_form)
+        
+        # Solvers por nivel de dt (se crean al primer uso)
+        self._solvers = {}
+        if adaptive_dt:
+            dt_levels = tuple(sorted(dt_levels))
+        else:
+            dt_levels = (self.dt,)
+        level = dt_levels.index(self.dt) if self.dt in dt_levels else 0
+        self.dt = dt_levels[level]
+        # Estadísticas de la condición inicial
+        T_min, T_max, T_sum = _minmaxsum(self.T.x.array)
+        T_avg = T_sum / self.T.x.array.size
+        prev_T_max = self.comm.allreduce(T_max, op=MPI.MAX)
         
         # Preparar archivos de salida
+        # Los buffers de T se alternan: se escribe siempre la misma función de salida
+        T_out = Function(self.V, name="Temperatura")
         filename = os.path.join(self.results_dir, f"bioreactor_{self.bioreactor_type}_evaporation_box.xdmf")
-        xdmf = XDMFFile(self.domain.comm, filename, "w")
-        xdmf.write_mesh(self.domain)
-        
-        # Arrays para estadísticas
-        times = []
-        T_max_values = []
-        T_min_values = []
-        T_avg_values = []
-        q_gen_values = []
-        q_evap_values = []
-        moisture_loss_values = []
+        if use_vtx:
+            filename = filename.replace('.xdmf', '.bp')
+            vtx = VTXWriter(self.domain.comm, filename, [T_out], engine="BP4")
+        else:
+            xdmf = XDMFFile(self.domain.comm, filename, "w")
+            xdmf.write_mesh(self.domain)
+        
+        # Arrays preasignados para estadísticas (máximo de pasos con el dt más chico)
+        n_steps = int(np.ceil((self.t_final - self.t) / min(dt_levels))) + 1
+        self._times = np.empty(n_steps, dtype=np.float64)
+        self._Tmax = np.empty(n_steps, dtype=np.float64)
+        self._Tmin = np.empty(n_steps, dtype=np.float64)
+        self._Tavg = np.empty(n_steps, dtype=np.float64)
+        self._qgen = np.empty(n_steps, dtype=np.float64)
+        self._qevap = np.empty(n_steps, dtype=np.float64)
+        self._moisture = np.empty(n_steps, dtype=np.float64)
+        n_rec = 0  # Pasos registrados
         
         # Control de salida
         next_save = 0.0
+        next_log = 3600.0
         step = 0
         
         print(f"🌡️ Configuración inicial:")
@@ -268,72 +387,109 @@ class BioreactorThermalModel:
         print(f"   - Objetivo humedad final: {self.mat_props.cacao['moisture_content_final']*100:.0f}%")
         
         # BUCLE TEMPORAL PRINCIPAL
-        while self.t < self.t_final:
-            self.t += self.dt
-            step += 1
-            
-            # Actualizar generación de calor Y evaporación
-            q_gen, q_evap_avg = self.update_heat_generation_and_evaporation()
-            
-            # Resolver sistema lineal
-            try:
-                uh = problem.solve()
-                self.T.x.array[:] = uh.x.array[:]
+        try:
+            while self.t < self.t_final:
+                self.t += self.dt
+                step += 1
                 
-                # Calcular estadísticas
+                # Actualizar generación de calor Y evaporación
+                q_gen, q_evap_avg = self.update_heat_generation_and_evaporation(T_max, T_avg)
+                
+                # Resolver sistema lineal: solver del dt actual, solo se
+                # re-ensambla el lado derecho
+                ksp = self._get_solver(self.dt, a_form, dt_const)
+                dt_const.value = self.dt
+                
+                # La solución anterior pasa a ser T_n; T se sobrescribe con el solve
+                self.T, self.T_n = self.T_n, self.T
+                
+                with b.localForm() as b_local:
+                    b_local.set(0.0)
+                assemble_vector(b, L_forms[id(self.T_n)])
+                b.ghostUpdate(addv=PETSc.InsertMode.ADD, mode=PETSc.ScatterMode.REVERSE)
+                
+                # Estimación inicial: extrapolación lineal 2*T_n - T_{n-1}
+                self.T.x.petsc_vec.axpby(2.0, -1.0, self.T_n.x.petsc_vec)
+                ksp.solve(b, self.T.x.petsc_vec)
+                # Solver iterativo: detener si no convergió (divergencia o max_it)
+                reason = ksp.getConvergedReason()
+                if reason < 0:
+                    raise RuntimeError(f"KSP no convergió (reason={reason}, "
+                                       f"iteraciones={ksp.getIterationNumber()})")
+                self.T.x.scatter_forward()
+                
+                # Calcular estadísticas (una sola pasada)
                 T_array = self.T.x.array
-                T_max = np.max(T_array)
-                T_min = np.min(T_array)
-                T_avg = np.mean(T_array)
+                T_min, T_max, T_sum = _minmaxsum(T_array)
+                T_avg = T_sum / T_array.size
+                
+                # Conversión a Celsius una sola vez por paso (escalares)
+                T_max_c = T_max - 273.15
+                T_avg_c = T_avg - 273.15
                 
                 # Guardar estadísticas
-                times.append(self.t)
-                T_max_values.append(T_max - 273.15)
-                T_min_values.append(T_min - 273.15)
-                T_avg_values.append(T_avg - 273.15)
-                q_gen_values.append(q_gen)
-                q_evap_values.append(q_evap_avg)
-                moisture_loss_values.append(self.total_moisture_loss)
+                self._times[n_rec] = self.t
+                self._Tmax[n_rec] = T_max_c
+                self._Tmin[n_rec] = T_min - 273.15
+                self._Tavg[n_rec] = T_avg_c
+                self._qgen[n_rec] = q_gen
+                self._qevap[n_rec] = q_evap_avg
+                self._moisture[n_rec] = self.total_moisture_loss
+                n_rec += 1
                 
                 # Verificar estabilidad
                 if T_max > 400:
-                    print(f"⚠️ ADVERTENCIA: Temperatura excesiva ({T_max-273.15:.1f}°C)")
+                    print(f"⚠️ ADVERTENCIA: Temperatura excesiva ({T_max_c:.1f}°C)")
                     break
                 
                 # Imprimir progreso cada hora
-                if step % (3600 // self.dt) == 0:
+                if self.t >= next_log:
+                    next_log += 3600.0
                     t_hours = self.t / 3600
                     death_status = "💀" if self.thermal_death_occurred else "🦠"
-                    moisture_percent = (self.total_moisture_loss / 
-                                      (self.mat_props.cacao['moisture_content_initial'] * 
-                                       self.mat_props.cacao['rho'])) * 100
+                    moisture_percent = self.total_moisture_loss * self.mat_props.cacao_moisture_denom_inv
                     
                     print(f"  {death_status} t = {t_hours:6.1f}h | "
-                          f"T_max = {T_max-273.15:5.1f}°C | "
-                          f"T_avg = {T_avg-273.15:5.1f}°C | "
+                          f"T_max = {T_max_c:5.1f}°C | "
+                          f"T_avg = {T_avg_c:5.1f}°C | "
                           f"q_gen = {q_gen:3.0f} W/m³ | "
                           f"q_evap = {q_evap_avg:3.0f} W/m³ | "
                           f"Humedad perdida: {moisture_percent:4.1f}%")
                 
                 # Guardar resultados
                 if self.t >= next_save:
-                    xdmf.write_function(self.T, self.t)
+                    T_out.x.array[:] = self.T.x.array
+                    if use_vtx:
+                        vtx.write(self.t)
+                    else:
+                        xdmf.write_function(T_out, self.t)
                     next_save += save_interval
                 
-                # Actualizar solución anterior
-                self.T_n.x.array[:] = self.T.x.array
-                
-            except Exception as e:
-                print(f"❌ Error en el paso {step}: {e}")
-                break
-        
-        # Cerrar archivo
-        xdmf.close()
+                # Paso adaptativo para el siguiente paso: T_max global, así todos
+                # los rangos eligen el mismo nivel (_get_solver es colectivo)
+                if adaptive_dt:
+                    T_max_global = self.comm.allreduce(T_max, op=MPI.MAX)
+                    level = self._next_dt_level(level, T_max_global - prev_T_max, dt_levels)
+                    self.dt = dt_levels[level]
+                    prev_T_max = T_max_global
+        
+        except Exception as e:
+            # Un solo bloque para todo el bucle: se registra el paso y se termina
+            print(f"❌ Error en el paso {step}: {e}")
+        
+        # Cerrar archivo y liberar objetos PETSc
+        if use_vtx:
+            vtx.close()
+        else:
+            xdmf.close()
+        for A, ksp in self._solvers.values():
+            ksp.destroy()
+            A.destroy()
+        self._solvers = {}
+        b.destroy()
         
         # Calcular humedad final
-        final_moisture_loss_percent = (self.total_moisture_loss / 
-                                     (self.mat_props.cacao['moisture_content_initial'] * 
-                                      self.mat_props.cacao['rho'])) * 100
+        final_moisture_loss_percent = self.total_moisture_loss * self.mat_props.cacao_moisture_denom_inv
         
         print(f"\n✅ Simulación completada!")
         print(f"   Resultados guardados en: {filename}")
@@ -347,6 +503,15 @@ class BioreactorThermalModel:
             print(f"   ✅ Muerte microbiana: NO")
             print(f"   🎉 ¡ÉXITO! ")
 
+        # Recortar series a los pasos registrados
+        times = self._times[:n_rec]
+        T_max_values = self._Tmax[:n_rec]
+        T_min_values = self._Tmin[:n_rec]
+        T_avg_values = self._Tavg[:n_rec]
+        q_gen_values = self._qgen[:n_rec]
+        q_evap_values = self._qevap[:n_rec]
+        moisture_loss_values = self._moisture[:n_rec]
+        
         # Guardar estadísticas extendidas
         self.save_statistics(times, T_max_values, T_min_values, T_avg_values, 
                            q_gen_values, q_evap_values, moisture_loss_values)
@@ -357,25 +522,25 @@ class BioreactorThermalModel:
         """Guarda estadísticas extendidas de la simulación"""
         import json
         
-        times_hours = [t/3600 for t in times]
+        # Conversión de arrays a listas solo aquí, al final
+        moisture = np.asarray(moisture, dtype=np.float64)
         
         stats = {
             'bioreactor_type': self.bioreactor_type,
             'material': 'wood',
             'evaporation': 'passive',
-            'times_hours': times_hours,
-            'T_max_celsius': T_max,
-            'T_min_celsius': T_min,
-            'T_avg_celsius': T_avg,
-            'heat_generation_W_m3': q_gen,
-            'evaporative_cooling_W_m3': q_evap,
-            'moisture_loss_kg_m3': [float(m) for m in moisture],
+            'times_hours': (np.asarray(times) / 3600).tolist(),
+            'T_max_celsius': np.asarray(T_max).tolist(),
+            'T_min_celsius': np.asarray(T_min).tolist(),
+            'T_avg_celsius': np.asarray(T_avg).tolist(),
+            'heat_generation_W_m3': np.asarray(q_gen).tolist(),
+            'evaporative_cooling_W_m3': np.asarray(q_evap).tolist(),
+            'moisture_loss_kg_m3': moisture.tolist(),
             'max_temp_reached_celsius': float(self.max_temp_reached - 273.15),
             'thermal_death_occurred': self.thermal_death_occurred,
             'death_time_hours': float(self.death_time/3600) if self.death_time else None,
-            'final_moisture_loss_percent': float(moisture[-1] / 
-                                                (self.mat_props.cacao['moisture_content_initial'] * 
-                                                 self.mat_props.cacao['rho']) * 100) if moisture else 0
+            'final_moisture_loss_percent': float(moisture[-1] * self.mat_props.cacao_moisture_denom_inv)
+                                           if moisture.size else 0
         }
         
         filename = os.path.join(self.results_dir, f"stats_{self.bioreactor_type}_evaporation_box.json")
@@ -397,7 +562,7 @@ def run_evaporation_simulation(bioreactor_type='box'):
     try:
         # Crear y ejecutar modelo
         model = BioreactorThermalModel(bioreactor_type)
-        times, T_max, T_min, T_avg = model.solve_transient(save_interval=3600)
+        times, T_max, T_min, T_avg = model.solve_transient(save_interval=7200)
         
         # Resumen final
         print(f"\n📈 ANÁLISIS FINAL:")
@@ -414,6 +579,7 @@ def run_evaporation_simulation(bioreactor_type='box'):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("🍫 MODELO TÉRMICO")
 
     # Ejecutar simulación
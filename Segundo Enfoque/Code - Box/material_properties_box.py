@@ -5,15 +5,225 @@ Proyecto: Modelado térmico de biorreactores para fermentación de cacao
 
 """
 
+import logging
+import math
 import numpy as np
 from dolfinx.fem import Function, functionspace
 import ufl
 
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit cuando Numba no está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Resúmenes por logging: los mensajes DEBUG no se formatean si no se muestran.
+# Los handlers los configura el script que se ejecute (bloques __main__)
+logger = logging.getLogger(__name__)
+
+
+# Constantes del modelo de convección natural y transferencia de masa
+_GR_COEFF = 9.81 * 0.5**3 / 1.5e-5**2   # g·L³/ν² (L = 0.5 m altura de cacao)
+_M_OVER_R = 0.018 / 8314                # M_agua / R
+
+# Tabla de mejora por flotabilidad: ΔT = T - T_amb en [0, 40] K cada 0.1 K
+# (en el primer intervalo se evalúa la fórmula exacta)
+_GR_CRIT = 1e4
+_ENH_DT = 0.1
+_ENH_INV_DT = 1.0 / _ENH_DT
+_ENH_N = int(round(40.0 * _ENH_INV_DT)) + 1
+
+
+def _enhancement_table(T_amb, buoyancy):
+    """
+    Mejora por convección natural (Grashof) tabulada en T_amb + [0, 40] K;
+    por encima de 40 K se usa el último valor (la mejora ya está saturada)
+    """
+    delta_T = _ENH_DT * np.arange(_ENH_N)
+    Gr = _GR_COEFF * delta_T / (T_amb + delta_T)
+    return np.where(Gr > _GR_CRIT,
+                    np.minimum(1.0 + 0.5 * np.log10(np.maximum(Gr, _GR_CRIT) / _GR_CRIT),
+                               buoyancy),
+                    1.0)
+
+
+@njit(inline='always', cache=True)
+def _lookup_enhancement(delta_T, T_amb, enh_grid):
+    """
+    Mejora por flotabilidad (delta_T > 0): fórmula exacta por debajo del primer
+    nodo no nulo, donde el umbral Gr = 1e4 y la saturación quedan muy por
+    debajo de 0.1 K; interpolación lineal en la tabla por encima.
+    El tope es enh_grid[1]: la fórmula crece con delta_T, así que
+    min(fórmula, buoyancy) = min(fórmula, enh_grid[1]) en ese intervalo
+    """
+    s = delta_T * _ENH_INV_DT
+    if s < 1.0:
+        Gr = _GR_COEFF * delta_T / (T_amb + delta_T)
+        if Gr <= _GR_CRIT:
+            return 1.0
+        return min(1.0 + 0.5 * math.log10(Gr / _GR_CRIT), enh_grid[1])
+    n = enh_grid.size - 1
+    if s >= n:
+        return enh_grid[n]
+    i = int(s)
+    return enh_grid[i] + (s - i) * (enh_grid[i + 1] - enh_grid[i])
+
+# Índices de la tabla de propiedades _props_arr[material, propiedad]
+WOOD, CACAO = 0, 1
+_PROP_K, _PROP_RHO, _PROP_CP, _PROP_ALPHA = range(4)
+
+# Índices del vector _evap_params (parámetros escalares de evaporación)
+(_EVAP_MOIST_INIT, _EVAP_MOIST_FINAL, _EVAP_WATER_ACTIVITY, _EVAP_POROSITY,
+ _EVAP_L_VAP, _EVAP_H_MASS, _EVAP_BUOYANCY, _EVAP_T_AMB) = range(8)
+
+
+@njit(inline='always', fastmath=True, cache=True)
+def _evap_point(T, a_w, moisture_factor, P_vapor_amb, T_amb,
+                L_vap, a_specific, h_mass0, enh_grid, cap):
+    """
+    Enfriamiento evaporativo [W/m³] en un nodo
+    """
+    Tc = T - 273.15
+    
+    # Presión de vapor saturado (Magnus-Tetens; math.* también sirve para escalares sin Numba)
+    if Tc > 0:
+        P_sat = 610.78 * math.exp(17.27 * Tc / (Tc + 237.3))
+    else:
+        P_sat = 610.78
+    
+    delta_P = a_w * P_sat - P_vapor_amb
+    if delta_P <= 0:
+        return 0.0
+    
+    # Mejora por convección natural (Grashof)
+    enhancement = 1.0
+    delta_T = T - T_amb
+    if delta_T > 0:
+        enhancement = _lookup_enhancement(delta_T, T_amb, enh_grid)
+    
+    m_evap = h_mass0 * enhancement * (_M_OVER_R / T) * delta_P * moisture_factor
+    return min(m_evap * L_vap * a_specific, cap)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _evap_kernel(T_arr, out, a_w, moisture_factor, P_vapor_amb, T_amb,
+                 L_vap, a_specific, h_mass0, enh_grid, cap):
+    """
+    Enfriamiento evaporativo [W/m³] nodo a nodo en una sola pasada (sin temporales)
+    """
+    for i in prange(T_arr.size):
+        out[i] = _evap_point(T_arr[i], a_w, moisture_factor, P_vapor_amb, T_amb,
+                             L_vap, a_specific, h_mass0, enh_grid, cap)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _evap_fill_kernel(T_arr, idx, out, a_w, moisture_factor, P_vapor_amb, T_amb,
+                      L_vap, a_specific, h_mass0, enh_grid, cap):
+    """
+    Evalúa la evaporación en T_arr[idx], escribe out[idx] y retorna la suma
+    (cálculo y escritura del coeficiente en un solo bucle paralelo)
+    """
+    total = 0.0
+    for k in prange(idx.size):
+        i = idx[k]
+        q = _evap_point(T_arr[i], a_w, moisture_factor, P_vapor_amb, T_amb,
+                        L_vap, a_specific, h_mass0, enh_grid, cap)
+        out[i] = q
+        total += q
+    return total
+
+
+def make_lut_writer(k_lut, rho_lut, cp_lut):
+    """
+    Crea un kernel que escribe k, rho y cp por celda en una sola pasada, con
+    los valores de las tablas [WOOD, CACAO] fijados como constantes
+    (marcador 1 = madera, cualquier otro = cacao)
+    """
+    k_wood, k_cacao = float(k_lut[WOOD]), float(k_lut[CACAO])
+    rho_wood, rho_cacao = float(rho_lut[WOOD]), float(rho_lut[CACAO])
+    cp_wood, cp_cacao = float(cp_lut[WOOD]), float(cp_lut[CACAO])
+    
+    if not NUMBA_AVAILABLE:
+        def write(markers, k_out, rho_out, cp_out):
+            """Propiedades por celda desde la tabla (NumPy)"""
+            wood = markers == 1
+            k_out[:] = np.where(wood, k_wood, k_cacao)
+            rho_out[:] = np.where(wood, rho_wood, rho_cacao)
+            cp_out[:] = np.where(wood, cp_wood, cp_cacao)
+        return write
+    
+    @njit
+    def write(markers, k_out, rho_out, cp_out):
+        """Propiedades por celda en un solo recorrido de los marcadores"""
+        for i in range(markers.size):
+            if markers[i] == 1:
+                k_out[i] = k_wood
+                rho_out[i] = rho_wood
+                cp_out[i] = cp_wood
+            else:
+                k_out[i] = k_cacao
+                rho_out[i] = rho_cacao
+                cp_out[i] = cp_cacao
+    return write
+
+
+if not NUMBA_AVAILABLE:
+    _ENH_IDX = np.arange(_ENH_N, dtype=np.float64)
+
+    def _evap_vec(T_arr, a_w, moisture_factor, P_vapor_amb, T_amb,
+                  L_vap, a_specific, h_mass0, enh_grid, cap):
+        """Enfriamiento evaporativo [W/m³] nodo a nodo (NumPy)"""
+        Tc = T_arr - 273.15
+        P_sat = np.where(Tc > 0, 610.78 * np.exp(17.27 * Tc / (Tc + 237.3)), 610.78)
+        delta_P = a_w * P_sat - P_vapor_amb
+        
+        delta_T = T_arr - T_amb
+        s = np.maximum(delta_T, 0.0) * _ENH_INV_DT
+        Gr = _GR_COEFF * delta_T / (T_amb + np.maximum(delta_T, 0.0))
+        near = np.where(Gr > _GR_CRIT,
+                        np.minimum(1.0 + 0.5 * np.log10(np.maximum(Gr, _GR_CRIT) / _GR_CRIT),
+                                   enh_grid[1]),
+                        1.0)
+        enhancement = np.where(
+            delta_T > 0,
+            np.where(s < 1.0, near, np.interp(s, _ENH_IDX, enh_grid)),
+            1.0
+        )
+        
+        m_evap = h_mass0 * enhancement * (_M_OVER_R / T_arr) * delta_P * moisture_factor
+        return np.where(delta_P > 0, np.minimum(m_evap * L_vap * a_specific, cap), 0.0)
+
+    def _evap_kernel(T_arr, out, *coeffs):
+        """Enfriamiento evaporativo [W/m³] nodo a nodo (NumPy)"""
+        out[:] = _evap_vec(T_arr, *coeffs)
+
+    def _evap_fill_kernel(T_arr, idx, out, *coeffs):
+        """Evaporación en T_arr[idx] escrita en out[idx]; retorna la suma (NumPy)"""
+        q = _evap_vec(T_arr[idx], *coeffs)
+        out[idx] = q
+        return q.sum()
+
+
 class MaterialProperties:
     """
     Clase para gestionar las propiedades térmicas -
     """
     
+    __slots__ = ('wood', 'cacao', 'ambient', 'thermal_limits', 'ventilation',
+                 'fermentation_control', 'microbial_state',
+                 '_P_sat_amb', '_P_vapor_ambient', '_q_base_hours', '_q_base_values',
+                 '_props_arr', '_evap_params', 'cacao_moisture_denom_inv',
+                 '_a_specific', '_enh_grid', '_lut_writer', '_evap_cap_coeff')
+    
     def __init__(self):
         """
         Define las propiedades térmicas incluyendo
@@ -45,6 +255,10 @@ class MaterialProperties:
         # Calcular difusividades térmicas
         self._calculate_diffusivities()
         
+        # Humedad perdida [kg/m³] → % del agua inicial: loss * cacao_moisture_denom_inv
+        self.cacao_moisture_denom_inv = 100.0 / (self.cacao['moisture_content_initial'] *
+                                                 self.cacao['rho'])
+        
         # Condiciones ambientales - Pueblo Bello, Cesar
         self.ambient = {
             'T_amb': 21.0 + 273.15,  # Temperatura ambiente [K] (21°C)
@@ -55,6 +269,11 @@ class MaterialProperties:
             'wind_speed': 0.5        # Velocidad del viento natural [m/s]
         }
         
+        # Presión de vapor ambiente (constante durante la simulación)
+        T_amb_c = self.ambient['T_amb'] - 273.15
+        self._P_sat_amb = 610.78 * math.exp(17.27 * T_amb_c / (T_amb_c + 237.3))
+        self._P_vapor_ambient = self.ambient['RH'] * self._P_sat_amb
+        
         # LÍMITES TÉRMICOS (sin cambios)
         self.thermal_limits = {
             'T_death_min': 55.0 + 273.15,  # Temperatura de muerte mínima [K] (55°C)
@@ -97,6 +316,39 @@ class MaterialProperties:
             'evaporative_cooling_feedback': True  # Ajustar fermentación según enfriamiento
         }
         
+        # Tablas contiguas para las rutas calientes (copia de los diccionarios al iniciar)
+        self._props_arr = np.array([
+            [m['k'], m['rho'], m['cp'], m['alpha']] for m in (self.wood, self.cacao)
+        ], dtype=np.float64)
+        self._evap_params = np.array([
+            self.cacao['moisture_content_initial'],
+            self.cacao['moisture_content_final'],
+            self.cacao['water_activity'],
+            self.cacao['porosity'],
+            self.ventilation['L_vap'],
+            self.ventilation['mass_transfer_coeff_natural'],
+            self.ventilation['buoyancy_enhancement'],
+            self.ambient['T_amb'],
+        ], dtype=np.float64)
+        
+        # Escritor de propiedades por celda especializado (se crea al primer uso)
+        self._lut_writer = None
+        
+        # Límite de evaporación por humedad: q_max = moisture_fraction * _evap_cap_coeff
+        # (1000 kg/m³ de agua disponible evaporados en 7 días)
+        self._evap_cap_coeff = 1000.0 * self.ventilation['L_vap'] / (7 * 24 * 3600)
+        
+        # Mejora por flotabilidad tabulada en ΔT (solo depende de T)
+        self._enh_grid = _enhancement_table(self.ambient['T_amb'],
+                                            self.ventilation['buoyancy_enhancement'])
+        
+        # Perfil base de calor (nodos del perfil lineal por tramos)
+        # Valores ajustados considerando enfriamiento evaporativo:
+        # inicial 0-12h, fermentación rápida 12-36h, pico bacterial 36-84h,
+        # declive 84-168h y constante después de 7 días
+        self._q_base_hours = np.array([0.0, 12.0, 36.0, 84.0, 168.0])
+        self._q_base_values = np.array([90.0, 130.0, 220.0, 320.0, 180.0])
+        
         # Estado de los microorganismos con control de humedad
         self.microbial_state = {
             'is_alive': True,
@@ -110,37 +362,76 @@ class MaterialProperties:
         """Calcula la difusividad térmica α = k/(ρ·cp) para cada material"""
         self.wood['alpha'] = self.wood['k'] / (self.wood['rho'] * self.wood['cp'])
         self.cacao['alpha'] = self.cacao['k'] / (self.cacao['rho'] * self.cacao['cp'])
+        
+        # Área específica de evaporación [m²/m³]
+        # Basada en el tamaño de los granos (d_bean = 0.01 m) y porosidad
+        self._a_specific = 6 * (1 - self.cacao['porosity']) / 0.01
     
-    def get_evaporative_cooling_passive(self, T, t, T_surface=None):
+    def get_evaporative_cooling_passive(self, T, t, T_surface=None, mask=None):
         """
         Calcula el enfriamiento evaporativo PASIVO
         Basado en diferencias de presión de vapor y convección natural
         
         Parámetros:
         -----------
-        T : float
-            Temperatura del cacao [K]
+        T : float o np.ndarray
+            Temperatura(s) del cacao [K]
         t : float
             Tiempo actual [s]
-        T_surface : float
+        T_surface : float o np.ndarray
             Temperatura de superficie (si es diferente)
+        mask : np.ndarray de bool, opcional
+            Si se da, solo se evalúan T[mask]; el resultado tiene la forma de T[mask]
             
         Retorna:
         --------
-        q_evap : float
-            Flujo de calor por evaporación [W/m³] (volumétrico)
+        q_evap : float o np.ndarray
+            Flujo de calor por evaporación [W/m³] (volumétrico);
+            float si T es escalar, array de la misma forma en otro caso
         """
+        # Usar temperatura de superficie si se proporciona
+        T_evap = np.asarray(T_surface if T_surface is not None else T, dtype=np.float64)
+        if mask is not None:
+            T_evap = T_evap[mask]
+        scalar_input = T_evap.ndim == 0
+        
         if not self.ventilation['evaporation_enabled']:
+            return 0.0 if scalar_input else np.zeros_like(T_evap)
+        
+        # Escalar: evaluación directa en el núcleo puntual (math.exp/log10)
+        if scalar_input:
+            return float(_evap_point(float(T_evap), *self._evap_coefficients(t)))
+        
+        # Núcleo fusionado: presión de vapor, Grashof, tasa de evaporación y límites
+        q_evap = np.empty_like(T_evap)
+        _evap_kernel(T_evap, q_evap, *self._evap_coefficients(t))
+        
+        return q_evap
+    
+    def fill_evaporative_cooling(self, T_array, idx, out, t):
+        """
+        Escribe el enfriamiento evaporativo [W/m³] de los nodos idx en out[idx]
+        
+        Equivale a out[idx] = get_evaporative_cooling_passive(T_array[idx], t)
+        en un solo bucle paralelo, sin arrays intermedios. Retorna la suma.
+        """
+        if not self.ventilation['evaporation_enabled']:
+            out[idx] = 0.0
             return 0.0
         
-        # Usar temperatura de superficie si se proporciona
-        T_evap = T_surface if T_surface is not None else T
-        T_celsius = T_evap - 273.15
+        return float(_evap_fill_kernel(T_array, idx, out, *self._evap_coefficients(t)))
+    
+    def _evap_coefficients(self, t):
+        """
+        Coeficientes escalares de evaporación en el tiempo t (argumentos de los kernels)
+        """
+        # Parámetros como locales (una sola lectura de la tabla)
+        (moist_init, moist_final, water_activity, porosity,
+         L_vap, h_mass0, buoyancy, T_amb) = self._evap_params.tolist()
         
         # Contenido de humedad actual (disminuye linealmente con el tiempo)
         t_days = t / (24 * 3600)
-        moisture_fraction = (self.cacao['moisture_content_initial'] - 
-                           (self.cacao['moisture_content_initial'] - self.cacao['moisture_content_final']) * 
+        moisture_fraction = (moist_init - (moist_init - moist_final) * 
                            min(t_days / 7.0, 1.0))
         
         # Si la humedad es muy baja, reducir evaporación
@@ -149,80 +440,14 @@ class MaterialProperties:
         else:
             moisture_factor = 1.0
         
-        # Presión de vapor saturado (Magnus-Tetens)
-        if T_celsius > 0:
-            P_sat = 610.78 * np.exp(17.27 * T_celsius / (T_celsius + 237.3))
-        else:
-            P_sat = 610.78
-        
         # Actividad de agua disminuye con el tiempo
-        a_w = self.cacao['water_activity'] * (0.7 + 0.3 * (1 - t_days/7.0))
-        
-        # Presión de vapor en la superficie del cacao
-        P_vapor_surface = a_w * P_sat
+        a_w = water_activity * (0.7 + 0.3 * (1 - t_days/7.0))
         
-        # Presión de vapor ambiente
-        T_amb_celsius = self.ambient['T_amb'] - 273.15
-        P_sat_amb = 610.78 * np.exp(17.27 * T_amb_celsius / (T_amb_celsius + 237.3))
-        P_vapor_ambient = self.ambient['RH'] * P_sat_amb
+        # Límites físicos: humedad disponible y máximo realista de 100 W/m³
+        cap = min(moisture_fraction * self._evap_cap_coeff, 100.0)
         
-        # Gradiente de presión de vapor
-        delta_P = P_vapor_surface - P_vapor_ambient
-        
-        if delta_P <= 0:
-            return 0.0
-        
-        # Coeficiente de transferencia de masa por convección natural
-        # Aumenta con la diferencia de temperatura (efecto chimenea)
-        delta_T = T_evap - self.ambient['T_amb']
-        if delta_T > 0:
-            # Número de Grashof para convección natural
-            g = 9.81  # gravedad
-            beta = 1 / T_evap  # coef. expansión térmica
-            L = 0.5  # longitud característica (altura de cacao)
-            nu = 1.5e-5  # viscosidad cinemática del aire
-            
-            Gr = g * beta * delta_T * L**3 / nu**2
-            
-            # Factor de mejora por convección natural (correlación simplificada)
-            if Gr > 1e4:  # Convección natural significativa
-                enhancement = 1.0 + 0.5 * np.log10(Gr / 1e4)
-                enhancement = min(enhancement, self.ventilation['buoyancy_enhancement'])
-            else:
-                enhancement = 1.0
-        else:
-            enhancement = 1.0
-        
-        # Coeficiente efectivo de transferencia de masa
-        h_mass = self.ventilation['mass_transfer_coeff_natural'] * enhancement
-        
-        # Densidad del aire
-        rho_air = self.ambient['P_atm'] / (287.05 * T_evap)
-        
-        # Tasa de evaporación [kg/m²·s]
-        # Usando analogía de Chilton-Colburn
-        M_water = 0.018  # kg/mol
-        R = 8314  # J/(mol·K)
-        
-        m_evap = h_mass * (M_water / (R * T_evap)) * delta_P * moisture_factor
-        
-        # Área específica de evaporación [m²/m³]
-        # Basada en el tamaño de los granos y porosidad
-        d_bean = 0.01  # diámetro promedio del grano [m]
-        a_specific = 6 * (1 - self.cacao['porosity']) / d_bean
-        
-        # Flujo de calor evaporativo volumétrico [W/m³]
-        q_evap = m_evap * self.ventilation['L_vap'] * a_specific
-        
-        # Límites físicos
-        # Máximo basado en la humedad disponible
-        max_evap_rate = moisture_fraction * 1000  # kg/m³ de agua disponible
-        max_q_evap = (max_evap_rate / (7 * 24 * 3600)) * self.ventilation['L_vap']
-        
-        q_evap = min(q_evap, max_q_evap)
-        q_evap = min(q_evap, 100.0)  # Límite máximo realista [W/m³]
-        
-        return q_evap
+        return (a_w, moisture_factor, self._P_vapor_ambient, T_amb,
+                L_vap, self._a_specific, h_mass0, self._enh_grid, cap)
     
     def get_fermentation_heat_profile(self, t, current_T_max=None, evap_cooling=0):
         """
@@ -251,7 +476,7 @@ class MaterialProperties:
             # Verificar muerte
             if current_T_max >= self.thermal_limits['T_death_min']:
                 if self.microbial_state['is_alive']:
-                    print(f"⚠️ MUERTE MICROBIANA detectada a t={t/3600:.1f}h, T={current_T_max-273.15:.1f}°C")
+                    logger.warning("⚠️ MUERTE MICROBIANA detectada a t=%.1fh, T=%.1f°C", t/3600, current_T_max-273.15)
                     self.microbial_state['is_alive'] = False
                     self.microbial_state['death_time'] = t
                     self.microbial_state['activity_factor'] = 0.0
@@ -269,7 +494,7 @@ class MaterialProperties:
         # Si están muertos, decaimiento exponencial
         if not self.microbial_state['is_alive'] and self.microbial_state['death_time'] is not None:
             time_since_death = t - self.microbial_state['death_time']
-            decay_factor = np.exp(-time_since_death / (6 * 3600))
+            decay_factor = math.exp(-time_since_death / (6 * 3600))
             q_base *= decay_factor
         
         return q_base
@@ -277,31 +502,18 @@ class MaterialProperties:
     def _get_base_heat_profile(self, t):
         """
         Perfil base de generación de calor
+        
+        Lineal por tramos en t: se evalúa con np.interp sobre sus nodos
+        (exacto, sin ramas por fase)
         """
-        t_hours = t / 3600.0
-        
-        # Valores ajustados considerando enfriamiento evaporativo
-        if t_hours < 12:
-            # Fase inicial (0-12h)
-            q = 90.0 + (130.0 - 90.0) * (t_hours / 12.0)
-        elif t_hours < 36:
-            # Fermentación rápida (12-36h)
-            q = 130.0 + (220.0 - 130.0) * ((t_hours - 12.0) / 24.0)
-        elif t_hours < 84:
-            # Pico bacterial (36-84h)
-            q = 220.0 + (320.0 - 220.0) * ((t_hours - 36.0) / 48.0)
-        elif t_hours < 168:
-            # Declive (84-168h)
-            q = 320.0 - (320.0 - 180.0) * ((t_hours - 84.0) / 84.0)
-        else:
-            # Después de 7 días
-            q = 180.0
-            
-        return q
+        return float(np.interp(t / 3600.0, self._q_base_hours, self._q_base_values))
     
-    def create_material_functions(self, domain, material_markers):
+    def create_material_functions(self, domain, material_markers, markers=None):
         """
         Crea funciones de FEniCSx para las propiedades
+        
+        markers: valores enteros (int32) de material_markers ya calculados;
+        si no se dan se convierten desde material_markers.x.array
         """
         # Crear espacio de funciones DG0
         Q = functionspace(domain, ("DG", 0))
@@ -311,23 +523,21 @@ class MaterialProperties:
         rho_func = Function(Q, name="Densidad")
         cp_func = Function(Q, name="Calor_especifico")
         
-        # Obtener array de marcadores
-        markers = material_markers.x.array
-        
-        # Asignar valores: 1 = madera, 2 = cacao
-        k_values = np.where(markers == 1, self.wood['k'], self.cacao['k'])
-        rho_values = np.where(markers == 1, self.wood['rho'], self.cacao['rho'])
-        cp_values = np.where(markers == 1, self.wood['cp'], self.cacao['cp'])
+        # Obtener array de marcadores (enteros)
+        if markers is None:
+            markers = material_markers.x.array.astype(np.int32)
         
-        # Asignar a las funciones
-        k_func.x.array[:] = k_values
-        rho_func.x.array[:] = rho_values
-        cp_func.x.array[:] = cp_values
+        # Asignar valores: 1 = madera, resto = cacao (kernel con la tabla fijada)
+        if self._lut_writer is None:
+            self._lut_writer = make_lut_writer(self._props_arr[:, _PROP_K],
+                                               self._props_arr[:, _PROP_RHO],
+                                               self._props_arr[:, _PROP_CP])
+        self._lut_writer(markers, k_func.x.array, rho_func.x.array, cp_func.x.array)
         
-        print(f"\n📋 Propiedades de materiales asignadas:")
-        print(f"   Paredes: {self.wood['name']}")
-        print(f"   Interior: {self.cacao['name']}")
-        print(f"   ✨ Con enfriamiento evaporativo pasivo")
+        logger.info("\n📋 Propiedades de materiales asignadas:")
+        logger.info("   Paredes: %s", self.wood['name'])
+        logger.info("   Interior: %s", self.cacao['name'])
+        logger.info("   ✨ Con enfriamiento evaporativo pasivo")
         
         return {
             'k': k_func,
@@ -349,37 +559,37 @@ class MaterialProperties:
     
     def print_summary(self):
         """Imprime resumen de propiedades"""
-        print("\n" + "="*60)
-        print("PROPIEDADES TÉRMICAS -")
-        print("="*60)
-        
-        print(f"\n{self.wood['name']} (Paredes):")
-        print(f"  - Conductividad (k): {self.wood['k']:.3f} W/m·K")
-        print(f"  - Densidad (ρ): {self.wood['rho']:.1f} kg/m³")
-        print(f"  - Calor específico (cp): {self.wood['cp']:.1f} J/kg·K")
-        
-        print(f"\n{self.cacao['name']} (Interior):")
-        print(f"  - Conductividad (k): {self.cacao['k']:.3f} W/m·K")
-        print(f"  - Densidad (ρ): {self.cacao['rho']:.1f} kg/m³")
-        print(f"  - Calor específico (cp): {self.cacao['cp']:.1f} J/kg·K")
-        print(f"  - Humedad inicial: {self.cacao['moisture_content_initial']*100:.0f}%")
-        print(f"  - Humedad final: {self.cacao['moisture_content_final']*100:.0f}%")
-        
-        print(f"\nCondiciones ambientales (Pueblo Bello):")
-        print(f"  - Temperatura: {self.ambient['T_amb']-273.15:.1f}°C")
-        print(f"  - Humedad relativa: {self.ambient['RH']*100:.0f}%")
-        print(f"  - Coef. convección base: {self.ambient['h_conv']:.1f} W/m²·K")
-        
-        print(f"\nEnfriamiento evaporativo:")
-        print(f"  - Modo: PASIVO (convección natural)")
-        print(f"  - Calor latente: {self.ventilation['L_vap']/1e6:.2f} MJ/kg")
-        print(f"  - Factor mejora por flotabilidad: {self.ventilation['buoyancy_enhancement']:.1f}x")
-        print(f"  - Pérdida de humedad esperada: {(self.cacao['moisture_content_initial']-self.cacao['moisture_content_final'])*100:.0f}%")
-        
-        print(f"\nVentilación (sin cambios):")
-        print(f"  - Inferior: {self.ventilation['bottom_area_fraction']*100:.0f}%")
-        print(f"  - Lateral: {self.ventilation['lateral_area_fraction']*100:.0f}%")
-        print(f"  - Coef. convección mejorado: {self.ventilation['enhanced_h_conv']:.0f} W/m²·K")
+        logger.info("\n%s", "=" * 60)
+        logger.info("PROPIEDADES TÉRMICAS -")
+        logger.info("=" * 60)
+        
+        logger.info("\n%s (Paredes):", self.wood['name'])
+        logger.info("  - Conductividad (k): %.3f W/m·K", self.wood['k'])
+        logger.info("  - Densidad (ρ): %.1f kg/m³", self.wood['rho'])
+        logger.info("  - Calor específico (cp): %.1f J/kg·K", self.wood['cp'])
+        
+        logger.info("\n%s (Interior):", self.cacao['name'])
+        logger.info("  - Conductividad (k): %.3f W/m·K", self.cacao['k'])
+        logger.info("  - Densidad (ρ): %.1f kg/m³", self.cacao['rho'])
+        logger.info("  - Calor específico (cp): %.1f J/kg·K", self.cacao['cp'])
+        logger.info("  - Humedad inicial: %.0f%%", self.cacao['moisture_content_initial']*100)
+        logger.info("  - Humedad final: %.0f%%", self.cacao['moisture_content_final']*100)
+        
+        logger.info("\nCondiciones ambientales (Pueblo Bello):")
+        logger.info("  - Temperatura: %.1f°C", self.ambient['T_amb']-273.15)
+        logger.info("  - Humedad relativa: %.0f%%", self.ambient['RH']*100)
+        logger.info("  - Coef. convección base: %.1f W/m²·K", self.ambient['h_conv'])
+        
+        logger.info("\nEnfriamiento evaporativo:")
+        logger.info("  - Modo: PASIVO (convección natural)")
+        logger.info("  - Calor latente: %.2f MJ/kg", self.ventilation['L_vap']/1e6)
+        logger.info("  - Factor mejora por flotabilidad: %.1fx", self.ventilation['buoyancy_enhancement'])
+        logger.info("  - Pérdida de humedad esperada: %.0f%%", (self.cacao['moisture_content_initial']-self.cacao['moisture_content_final'])*100)
+        
+        logger.info("\nVentilación (sin cambios):")
+        logger.info("  - Inferior: %.0f%%", self.ventilation['bottom_area_fraction']*100)
+        logger.info("  - Lateral: %.0f%%", self.ventilation['lateral_area_fraction']*100)
+        logger.info("  - Coef. convección mejorado: %.0f W/m²·K", self.ventilation['enhanced_h_conv'])
 
 
 def test_evaporative_cooling():
@@ -387,7 +597,7 @@ def test_evaporative_cooling():
     props = MaterialProperties()
     props.print_summary()
     
-    print("\n💧 Probando enfriamiento evaporativo:")
+    logger.info("\n💧 Probando enfriamiento evaporativo:")
     temperatures = [30, 40, 45, 50, 55]  # °C
     times = [12, 36, 60, 84]  # horas
     
@@ -396,8 +606,10 @@ def test_evaporative_cooling():
         for t_h in times:
             t_s = t_h * 3600
             q_evap = props.get_evaporative_cooling_passive(T_k, t_s)
-            print(f"  T={T_c}°C, t={t_h}h: q_evap = {q_evap:.1f} W/m³")
+            logger.debug("  T=%s°C, t=%sh: q_evap = %.1f W/m³", T_c, t_h, q_evap)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
     test_evaporative_cooling()
\ No newline at end of file
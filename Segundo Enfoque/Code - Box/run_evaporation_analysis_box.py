@@ -7,8 +7,12 @@ Script principal para ejecutar simulación
 import os
 import sys
 import time
+import json
+import logging
 from datetime import datetime
 
+import numpy as np
+
 # Importar el modelo
 from main_thermal_model_box import run_evaporation_simulation
 from visualization_box import BioreactorVisualizer
@@ -91,11 +95,14 @@ def create_evaporation_report(model, times, T_max, T_min, T_avg):
     """Crea un reporte detallado de la evaporación"""
     
     # Cargar estadísticas
-    import json
     stats_file = os.path.join(model.results_dir, f"stats_{model.bioreactor_type}_evaporation_box.json")
     with open(stats_file, 'r') as f:
         stats = json.load(f)
     
+    # Series como arrays (reducciones vectorizadas)
+    T_max_arr = np.asarray(T_max, dtype=np.float64)
+    T_min_arr = np.asarray(T_min, dtype=np.float64)
+    
     report_lines = []
     report_lines.append("REPORTE DE SIMULACIÓN - ENFRIAMIENTO EVAPORATIVO")
     report_lines.append("="*60)
@@ -112,16 +119,17 @@ def create_evaporation_report(model, times, T_max, T_min, T_avg):
     
     # Resultados térmicos
     report_lines.append("RESULTADOS TÉRMICOS:")
-    report_lines.append(f"- Temperatura máxima: {max(T_max):.1f}°C")
+    report_lines.append(f"- Temperatura máxima: {T_max_arr.max():.1f}°C")
     report_lines.append(f"- Temperatura promedio final: {T_avg[-1]:.1f}°C")
-    report_lines.append(f"- Gradiente máximo: {max([T_max[i]-T_min[i] for i in range(len(T_max))]):.1f}°C")
+    report_lines.append(f"- Gradiente máximo: {np.max(T_max_arr - T_min_arr):.1f}°C")
     report_lines.append("")
     
     # Evaporación
     report_lines.append("ENFRIAMIENTO EVAPORATIVO:")
     if 'evaporative_cooling_W_m3' in stats:
-        max_evap = max(stats['evaporative_cooling_W_m3'])
-        avg_evap = sum(stats['evaporative_cooling_W_m3'])/len(stats['evaporative_cooling_W_m3'])
+        evap_arr = np.asarray(stats['evaporative_cooling_W_m3'], dtype=np.float64)
+        max_evap = evap_arr.max()
+        avg_evap = evap_arr.mean()
         report_lines.append(f"- Enfriamiento máximo: {max_evap:.0f} W/m³")
         report_lines.append(f"- Enfriamiento promedio: {avg_evap:.0f} W/m³")
     
@@ -155,6 +163,7 @@ def create_evaporation_report(model, times, T_max, T_min, T_avg):
     print(f"\n📝 Reporte guardado en: {filename}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     try:
         success = main()
         if success:
@@ -11,6 +11,7 @@ import matplotlib.colors as mcolors
 from matplotlib.patches import Rectangle
 import json
 import os
+from functools import lru_cache
 
 # Para visualización 3D
 try:
@@ -23,6 +24,43 @@ except ImportError:
     print("⚠️ PyVista no instalado. Visualización 3D no disponible.")
     print("   Instalar con: pip install pyvista")
 
+# Lectura directa del HDF5 compañero del XDMF (opcional)
+try:
+    import h5py
+    H5PY_AVAILABLE = True
+except ImportError:
+    H5PY_AVAILABLE = False
+
+
+@lru_cache(maxsize=16)
+def _load_json(filepath, mtime):
+    """Lee y parsea un JSON; la clave incluye mtime para invalidar si cambia"""
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+
+# Series temporales numéricas de los JSON de estadísticas
+_NUMERIC_KEYS = ('times_hours', 'T_max_celsius', 'T_min_celsius', 'T_avg_celsius',
+                 'heat_generation_W_m3', 'evaporative_cooling_W_m3')
+
+
+def _series_to_arrays(stats):
+    """Reemplaza en el dict las listas numéricas por ndarrays float64"""
+    for key in _NUMERIC_KEYS:
+        if key in stats:
+            stats[key] = np.asarray(stats[key], dtype=np.float64)
+    return stats
+
+
+# Fases de fermentación: (inicio [h], fin [h], etiqueta, color)
+_FERMENTATION_PHASES = (
+    (0, 12, 'Inicial\n(Levaduras)', 'lightgreen'),
+    (12, 36, 'Fermentación\nrápida', 'yellow'),
+    (36, 84, 'Pico bacterial\n(BAA)', 'orange'),
+    (84, 168, 'Declive', 'lightcoral')
+)
+
+
 class BioreactorVisualizer:
     """
     Visualizador completo con capacidades 2D y 3D
@@ -44,6 +82,9 @@ class BioreactorVisualizer:
             'evaporation': 'Blues_r',
             'heat_gen': 'Reds'
         }
+        
+        # Grids sintéticos de plot_3d_mesh_structure, por espesor de pared
+        self._structure_grids = {}
     
     def load_statistics(self, filename):
         """Carga estadísticas de simulación"""
@@ -52,8 +93,7 @@ class BioreactorVisualizer:
             print(f"⚠️ No se encontró: {filepath}")
             return None
         
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        return _series_to_arrays(_load_json(filepath, os.path.getmtime(filepath)))
     
     def plot_2d_evolution(self, stats_file='stats_box_evaporation_box.json'):
         """Visualización 2D"""
@@ -71,12 +111,12 @@ class BioreactorVisualizer:
         ax3 = fig.add_subplot(gs[1, 1])  # Enfriamiento evaporativo
         ax4 = fig.add_subplot(gs[2, :])  # Balance térmico
         
-        times = np.array(stats['times_hours'])
-        T_max = np.array(stats['T_max_celsius'])
-        T_min = np.array(stats['T_min_celsius'])
-        T_avg = np.array(stats['T_avg_celsius'])
-        q_gen = np.array(stats['heat_generation_W_m3'])
-        q_evap = np.array(stats['evaporative_cooling_W_m3'])
+        times = np.asarray(stats['times_hours'])
+        T_max = np.asarray(stats['T_max_celsius'])
+        T_min = np.asarray(stats['T_min_celsius'])
+        T_avg = np.asarray(stats['T_avg_celsius'])
+        q_gen = np.asarray(stats['heat_generation_W_m3'])
+        q_evap = np.asarray(stats['evaporative_cooling_W_m3'])
         
         # GRÁFICO 1: Evolución de temperatura con zonas
         ax1.plot(times, T_max, 'r-', linewidth=2.5, label='T máxima')
@@ -121,9 +161,10 @@ class BioreactorVisualizer:
         ax4.plot(times, q_gen, 'orange', linewidth=2, label='Generación')
         ax4.plot(times, -q_evap, 'blue', linewidth=2, label='Evaporación')
         ax4.plot(times, balance, 'green', linewidth=3, label='Balance neto')
-        ax4.fill_between(times, 0, balance, where=(balance>=0), 
+        heating = balance >= 0
+        ax4.fill_between(times, 0, np.where(heating, balance, 0.0),
                         color='red', alpha=0.3, label='Calentamiento')
-        ax4.fill_between(times, 0, balance, where=(balance<0), 
+        ax4.fill_between(times, 0, np.where(heating, 0.0, balance),
                         color='blue', alpha=0.3, label='Enfriamiento')
         ax4.axhline(y=0, color='black', linestyle='-', alpha=0.5)
         ax4.set_xlabel('Tiempo [horas]')
@@ -142,7 +183,7 @@ class BioreactorVisualizer:
         plt.show()
     
     def visualize_3d_fields(self, xdmf_file='bioreactor_box_evaporation_box.xdmf', 
-                           time_step=-1):
+                           time_step=-1, interactive=True):
         """
         Visualización 3D de campos térmicos y evaporación
         
@@ -152,6 +193,8 @@ class BioreactorVisualizer:
             Archivo XDMF con resultados de la simulación
         time_step : int
             Paso temporal a visualizar (-1 para el último)
+        interactive : bool
+            Si False, renderiza fuera de pantalla y solo guarda la captura
         """
         if not PYVISTA_AVAILABLE:
             print("❌ PyVista no disponible para visualización 3D")
@@ -176,21 +219,26 @@ class BioreactorVisualizer:
         if 'Temperatura' in mesh.point_data:
             mesh['Temperatura_C'] = mesh['Temperatura'] - 273.15
         
+        # Centro del dominio (común a los tres cortes)
+        center = mesh.center
+        
         # Crear visualización
-        plotter = pv.Plotter(shape=(2, 2), window_size=[1600, 1200])
+        plotter = pv.Plotter(shape=(2, 2), window_size=[1600, 1200],
+                             off_screen=not interactive)
         
         # VISTA 1: Campo de temperatura
         plotter.subplot(0, 0)
         plotter.add_text("Campo de Temperatura", font_size=12)
         
         # Crear corte para mostrar interior
-        slice_temp = mesh.slice(normal='y', origin=mesh.center)
+        slice_temp = mesh.slice(normal='y', origin=center)
         plotter.add_mesh(slice_temp, scalars='Temperatura_C', 
                         cmap='hot', clim=[20, 60],
                         scalar_bar_args={'title': 'Temperatura [°C]'})
         
-        # Contorno de isotermas
-        contours = mesh.contour(isosurfaces=5, scalars='Temperatura_C')
+        # Contorno de isotermas sobre una rejilla 2× más gruesa
+        contours = self._coarse_grid(mesh).contour(isosurfaces=5,
+                                                   scalars='Temperatura_C')
         plotter.add_mesh(contours, opacity=0.3, color='white', line_width=2)
         
         # VISTA 2: Generación de calor
@@ -198,7 +246,7 @@ class BioreactorVisualizer:
         plotter.add_text("Generación de Calor", font_size=12)
         
         if 'Generacion_calor' in mesh.cell_data:
-            slice_gen = mesh.slice(normal='z', origin=mesh.center)
+            slice_gen = mesh.slice(normal='z', origin=center)
             plotter.add_mesh(slice_gen, scalars='Generacion_calor',
                            cmap='Reds', clim=[0, 400],
                            scalar_bar_args={'title': 'q_gen [W/m³]'})
@@ -208,7 +256,7 @@ class BioreactorVisualizer:
         plotter.add_text("Enfriamiento Evaporativo", font_size=12)
         
         if 'Enfriamiento_evaporativo' in mesh.cell_data:
-            slice_evap = mesh.slice(normal='x', origin=mesh.center)
+            slice_evap = mesh.slice(normal='x', origin=center)
             plotter.add_mesh(slice_evap, scalars='Enfriamiento_evaporativo',
                            cmap='Blues_r', clim=[0, 150],
                            scalar_bar_args={'title': 'q_evap [W/m³]'})
@@ -237,18 +285,73 @@ class BioreactorVisualizer:
             plotter.add_text(f"Tiempo: {time_hours:.1f} horas", 
                            position='upper_right', font_size=10)
         
-        # Mostrar
-        plotter.show()
-        
-        # Guardar captura
+        # Mostrar y guardar captura con un único render
         output_file = os.path.join(self.results_dir, 'thermal_3d_view_box.png')
-        plotter.screenshot(output_file)
+        if interactive:
+            plotter.show(screenshot=output_file)
+        else:
+            plotter.screenshot(output_file)
+            plotter.close()
         print(f"📸 Vista 3D guardada: {output_file}")
     
+    @staticmethod
+    def _coarse_grid(mesh, factor=2):
+        """Remuestrea el mesh en una ImageData más gruesa (para isosuperficies)"""
+        xmin, xmax, ymin, ymax, zmin, zmax = mesh.bounds
+        n = max(8, int(round(mesh.n_points ** (1 / 3) / factor)))
+        probe = pv.ImageData(dimensions=(n, n, n),
+                             spacing=((xmax - xmin) / (n - 1),
+                                      (ymax - ymin) / (n - 1),
+                                      (zmax - zmin) / (n - 1)),
+                             origin=(xmin, ymin, zmin))
+        return probe.sample(mesh)
+    
+    @staticmethod
+    def _iter_temperature(reader, filepath, time_values, n_points):
+        """
+        Genera (t, T[K]) por paso temporal leyendo solo el dataset de
+        temperatura del .h5 compañero; si no es posible (tiempos que no
+        coinciden o tamaño distinto de n_points), recurre al lector XDMF completo.
+        """
+        h5_path = os.path.splitext(filepath)[0] + '.h5'
+        if H5PY_AVAILABLE and os.path.exists(h5_path):
+            with h5py.File(h5_path, 'r') as h5f:
+                group = h5f.get('Function/Temperatura')
+                if group is not None:
+                    # DOLFINx nombra los datasets con el tiempo y '_' en lugar
+                    # de '.' (p. ej. '4512_5'); float() aceptaría '_' como separador
+                    keys, times = [], []
+                    for key in group.keys():
+                        try:
+                            times.append(float(key.replace('_', '.')))
+                        except ValueError:
+                            continue
+                        keys.append(key)
+                    times = np.asarray(times)
+                    
+                    datasets = []
+                    for t in time_values:
+                        hits = np.flatnonzero(np.isclose(times, t))
+                        if hits.size == 0:
+                            break
+                        dataset = group[keys[hits[0]]]
+                        if dataset.size != n_points:
+                            break
+                        datasets.append(dataset)
+                    else:
+                        for t, dataset in zip(time_values, datasets):
+                            yield t, dataset[...].reshape(-1)
+                        return
+        
+        for t in time_values:
+            reader.set_active_time_value(t)
+            yield t, reader.read()['Temperatura']
+    
     def create_animation_3d(self, xdmf_file='bioreactor_box_evaporation_box.xdmf',
-                           output_gif='thermal_animation_box.gif'):
+                           output_gif='thermal_animation_box.gif', target_frames=60):
         """
         Crea animación 3D de la evolución temporal
+        (target_frames: número aproximado de cuadros del GIF)
         """
         if not PYVISTA_AVAILABLE:
             print("❌ PyVista no disponible para animación")
@@ -260,45 +363,52 @@ class BioreactorVisualizer:
         
         print("🎬 Creando animación 3D...")
         
-        # Leer datos
+        # Leer datos: la topología es fija, se lee una sola vez
         reader = pv.get_reader(filepath)
+        # Muestreo adaptado a la duración: ~target_frames cuadros en total
+        stride = max(1, len(reader.time_values) // target_frames)
+        time_values = reader.time_values[::stride]
+        reader.set_active_time_value(time_values[0])
+        mesh = reader.read()
+        center = mesh.center
         
         # Configurar plotter
         plotter = pv.Plotter(off_screen=True, window_size=[800, 600])
-        plotter.open_gif(os.path.join(self.results_dir, output_gif))
+        plotter.open_gif(os.path.join(self.results_dir, output_gif),
+                         fps=15, palettesize=64)
+        
+        # Actores creados una vez; cada cuadro solo actualiza escalares y texto
+        slice_mesh = None
+        text_actor = plotter.add_text("", position='upper_left')
         
         # Animar cada paso temporal
-        for i, time_value in enumerate(reader.time_values[::6]):  # Cada 6 pasos
-            reader.set_active_time_value(time_value)
-            mesh = reader.read()
+        for time_value, T_K in self._iter_temperature(reader, filepath,
+                                                      time_values, mesh.n_points):
+            mesh.point_data['Temperatura_C'] = T_K - 273.15
             
-            if 'Temperatura' in mesh.point_data:
-                mesh['Temperatura_C'] = mesh['Temperatura'] - 273.15
-            
-            plotter.clear()
-            
-            # Agregar corte animado
-            slice_mesh = mesh.slice(normal='y', origin=mesh.center)
-            plotter.add_mesh(slice_mesh, scalars='Temperatura_C',
-                           cmap='hot', clim=[20, 60])
+            # Corte animado (misma topología en todos los pasos)
+            new_slice = mesh.slice(normal='y', origin=center)
+            if slice_mesh is None:
+                slice_mesh = new_slice
+                plotter.add_mesh(slice_mesh, scalars='Temperatura_C',
+                               cmap='hot', clim=[20, 60])
+            else:
+                slice_mesh.point_data['Temperatura_C'][:] = new_slice['Temperatura_C']
+                slice_mesh.Modified()
             
             # Texto temporal
             time_hours = time_value / 3600
-            plotter.add_text(f"t = {time_hours:.1f} h", position='upper_left')
+            text_actor.SetText(2, f"t = {time_hours:.1f} h")
             
             plotter.write_frame()
         
         plotter.close()
         print(f"🎬 Animación guardada: {output_gif}")
     
-    def plot_3d_mesh_structure(self):
-        """
-        Visualiza la estructura del mesh 3D con materiales
-        """
-        if not PYVISTA_AVAILABLE:
-            return
-        
-        print("🔲 Visualizando estructura del mesh...")
+    def _synthetic_box_grid(self, thickness):
+        """Grid sintético de la caja con materiales (se construye una vez)"""
+        if thickness in self._structure_grids:
+            return self._structure_grids[thickness]
         
         # Crear mesh sintético para demostración
         # (En producción, cargar desde archivo real)
@@ -318,24 +428,33 @@ class BioreactorVisualizer:
         grid.points = points
         grid.dimensions = [nx, ny, nz]
         
-        # Asignar materiales (simplificado)
-        thickness = 0.03
-        materials = np.zeros(grid.n_cells)
+        # Asignar materiales (simplificado); centros calculados una sola vez
+        centers = np.asarray(grid.cell_centers().points)
+        cx, cy, cz = centers[:, 0], centers[:, 1], centers[:, 2]
         
-        for i in range(grid.n_cells):
-            center = grid.cell_centers().points[i]
-            x, y, z = center
-            
-            # Interior (cacao) o exterior (madera)
-            if (thickness < x < L_ext - thickness and
-                thickness < y < W_ext - thickness and
-                thickness < z < H_ext - thickness):
-                materials[i] = 2  # Cacao
-            else:
-                materials[i] = 1  # Madera
+        # Interior (cacao) o exterior (madera)
+        interior = ((cx > thickness) & (cx < L_ext - thickness) &
+                    (cy > thickness) & (cy < W_ext - thickness) &
+                    (cz > thickness) & (cz < H_ext - thickness))
+        materials = np.where(interior, 2.0, 1.0).astype(np.float32)  # 2 = Cacao, 1 = Madera
         
         grid.cell_data['Material'] = materials
         
+        self._structure_grids[thickness] = grid
+        return grid
+    
+    def plot_3d_mesh_structure(self):
+        """
+        Visualiza la estructura del mesh 3D con materiales
+        """
+        if not PYVISTA_AVAILABLE:
+            return
+        
+        print("🔲 Visualizando estructura del mesh...")
+        
+        thickness = 0.03
+        grid = self._synthetic_box_grid(thickness)
+        
         # Visualizar
         plotter = pv.Plotter()
         plotter.add_mesh(grid, scalars='Material', 
@@ -346,20 +465,18 @@ class BioreactorVisualizer:
         # Agregar ventilación
         # Crear cilindros para representar agujeros
         hole_radius = 0.0025
-        hole_positions = []
-        
-        # Agujeros inferiores
-        for i in range(8):
-            for j in range(10):
-                x = 0.1 + i * 0.08
-                y = 0.1 + j * 0.07
-                z = 0.0
-                hole_positions.append([x, y, z])
-        
-        for pos in hole_positions[:40]:  # Mostrar algunos
-            cylinder = pv.Cylinder(center=pos, direction=[0, 0, 1],
+        
+        # Agujeros inferiores (rejilla 8×10 en z = 0)
+        hx, hy = np.meshgrid(np.arange(8) * 0.08 + 0.1,
+                             np.arange(10) * 0.07 + 0.1, indexing='ij')
+        hole_positions = np.column_stack([hx.ravel(), hy.ravel(),
+                                          np.zeros(hx.size)])
+        
+        # Un único actor con todos los cilindros (mostrar algunos)
+        cylinders = [pv.Cylinder(center=pos, direction=[0, 0, 1],
                                  radius=hole_radius, height=thickness)
-            plotter.add_mesh(cylinder, color='black')
+                     for pos in hole_positions[:40]]
+        plotter.add_mesh(cylinders[0].merge(cylinders[1:]), color='black')
         
         plotter.add_text("Estructura del Biorreactor", font_size=14)
         plotter.add_axes()
@@ -368,18 +485,19 @@ class BioreactorVisualizer:
         plotter.show()
     
     def _add_fermentation_zones(self, ax):
-        """Agrega zonas de fermentación al gráfico"""
-        phases = [
-            (0, 12, 'Inicial\n(Levaduras)', 'lightgreen', 0.2),
-            (12, 36, 'Fermentación\nrápida', 'yellow', 0.2),
-            (36, 84, 'Pico bacterial\n(BAA)', 'orange', 0.2),
-            (84, 168, 'Declive', 'lightcoral', 0.2)
-        ]
-        
-        for t_start, t_end, label, color, alpha in phases:
-            ax.axvspan(t_start, t_end, alpha=alpha, color=color)
+        """Agrega zonas de fermentación al gráfico (un único artista)"""
+        # Franjas en coordenadas de eje en y (como axvspan): cubren todo el
+        # alto sin fijar ylim, así los límites añadidos después siguen visibles
+        ax.broken_barh([(t_start, t_end - t_start)
+                        for t_start, t_end, _, _ in _FERMENTATION_PHASES],
+                       (0, 1),
+                       facecolors=[color for _, _, _, color in _FERMENTATION_PHASES],
+                       alpha=0.2, transform=ax.get_xaxis_transform())
+        
+        y1 = ax.get_ylim()[1]
+        for t_start, t_end, label, _ in _FERMENTATION_PHASES:
             t_center = (t_start + t_end) / 2
-            ax.text(t_center, ax.get_ylim()[1]*0.95, label, 
+            ax.text(t_center, y1*0.95, label, 
                    ha='center', va='top', fontsize=9, fontweight='bold')
     
     def create_summary_report(self, stats_file='stats_box_evaporation_box.json'):
@@ -408,9 +526,9 @@ class BioreactorVisualizer:
         Ventilación: 50% inferior + 25% laterales
         
         RESULTADOS CLAVE:
-        • Temperatura máxima: {max(stats['T_max_celsius']):.1f}°C
+        • Temperatura máxima: {stats['T_max_celsius'].max():.1f}°C
         • Muerte microbiana: {'SÍ' if stats['thermal_death_occurred'] else 'NO ✓'}
-        • Enfriamiento evaporativo máximo: {max(stats['evaporative_cooling_W_m3']):.0f} W/m³
+        • Enfriamiento evaporativo máximo: {stats['evaporative_cooling_W_m3'].max():.0f} W/m³
         • Pérdida de humedad final: {stats.get('final_moisture_loss_percent', 0):.1f}%
         """
         
@@ -59,6 +59,25 @@ class HexagonalBioreactorGeometry:
         print(f"   - Densidad cacao real: {self.densidad_cacao:.0f} kg/m³")
         print(f"   - Distribución real: {self.cacao_fraction*100:.1f}%/{self.aire_fraction*100:.1f}%")
         
+    def _add_hexagonal_prism(self, radius, z0, height):
+        """
+        Crea un prisma hexagonal extruido en z y retorna el tag del volumen
+        
+        Los vértices se calculan de una vez con NumPy; OCC no tiene una
+        primitiva de polígono, así que el contorno se arma con 6 líneas.
+        """
+        angles = np.arange(6) * np.pi / 3
+        xs = radius * np.cos(angles)
+        ys = radius * np.sin(angles)
+        
+        occ = gmsh.model.occ
+        points = [occ.addPoint(x, y, z0) for x, y in zip(xs.tolist(), ys.tolist())]
+        lines = [occ.addLine(points[i], points[(i+1) % 6]) for i in range(6)]
+        
+        loop = occ.addCurveLoop(lines)
+        surface = occ.addPlaneSurface([loop])
+        return occ.extrude([(2, surface)], 0, 0, height)[1][1]
+    
     def create_hexagonal_mesh(self):
         """
         Crea mesh con VOLÚMENES CONTROLADOS
@@ -79,60 +98,21 @@ class HexagonalBioreactorGeometry:
         try:
             # GEOMETRÍA SIMPLIFICADA CONTROLADA
             # 1. Hexágono externo (madera)
-            wood_points = []
-            for i in range(6):
-                angle = i * np.pi / 3
-                x = self.R_ext * np.cos(angle)
-                y = self.R_ext * np.sin(angle)
-                wood_points.append(gmsh.model.occ.addPoint(x, y, 0))
-            
-            wood_lines = []
-            for i in range(6):
-                wood_lines.append(gmsh.model.occ.addLine(wood_points[i], wood_points[(i+1)%6]))
-            
-            wood_loop = gmsh.model.occ.addCurveLoop(wood_lines)
-            wood_surface = gmsh.model.occ.addPlaneSurface([wood_loop])
-            wood_volume = gmsh.model.occ.extrude([(2, wood_surface)], 0, 0, self.L)[1][1]
+            wood_volume = self._add_hexagonal_prism(self.R_ext, 0.0, self.L)
             
             # 2. Hexágono interno - CACAO (parte inferior - 70%)
-            cacao_points = []
             radius_cacao = self.R_int * 0.95  # Ligeramente menor para evitar problemas
-            for i in range(6):
-                angle = i * np.pi / 3
-                x = radius_cacao * np.cos(angle)
-                y = radius_cacao * np.sin(angle)
-                cacao_points.append(gmsh.model.occ.addPoint(x, y, 0))
-            
-            cacao_lines = []
-            for i in range(6):
-                cacao_lines.append(gmsh.model.occ.addLine(cacao_points[i], cacao_points[(i+1)%6]))
-            
-            cacao_loop = gmsh.model.occ.addCurveLoop(cacao_lines)
-            cacao_surface = gmsh.model.occ.addPlaneSurface([cacao_loop])
             
             # ALTURA CONTROLADA para 70% del volumen
             height_cacao = self.L * 0.70  # 70% de la longitud
-            cacao_volume = gmsh.model.occ.extrude([(2, cacao_surface)], 0, 0, height_cacao)[1][1]
+            cacao_volume = self._add_hexagonal_prism(radius_cacao, 0.0, height_cacao)
             
             # 3. Hexágono interno - AIRE (parte superior - 30%)
-            air_points = []
             radius_air = self.R_int * 0.90  # Más pequeño que cacao
-            for i in range(6):
-                angle = i * np.pi / 3
-                x = radius_air * np.cos(angle)
-                y = radius_air * np.sin(angle)
-                air_points.append(gmsh.model.occ.addPoint(x, y, height_cacao))
-            
-            air_lines = []
-            for i in range(6):
-                air_lines.append(gmsh.model.occ.addLine(air_points[i], air_points[(i+1)%6]))
-            
-            air_loop = gmsh.model.occ.addCurveLoop(air_lines)
-            air_surface = gmsh.model.occ.addPlaneSurface([air_loop])
             
             # ALTURA CONTROLADA para 30% del volumen
             height_air = self.L * 0.30  # 30% de la longitud
-            air_volume = gmsh.model.occ.extrude([(2, air_surface)], 0, 0, height_air)[1][1]
+            air_volume = self._add_hexagonal_prism(radius_air, height_cacao, height_air)
             
             # Sincronizar
             gmsh.model.occ.synchronize()
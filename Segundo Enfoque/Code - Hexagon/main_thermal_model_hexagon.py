@@ -5,20 +5,80 @@ main_thermal_model_hexagon.py
 
 import numpy as np
 import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from mpi4py import MPI
 from dolfinx import mesh, fem, io
 from dolfinx.fem import functionspace, Function, Constant, assemble_scalar
-from dolfinx.fem.petsc import LinearProblem
+from dolfinx.fem.petsc import assemble_matrix, assemble_vector, create_vector
 from dolfinx.io import XDMFFile, VTXWriter
 import ufl
 from ufl import dx, grad, dot, inner, Measure
 from petsc4py import PETSc
 from petsc4py.PETSc import ScalarType
 
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit cuando Numba no está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# orjson es opcional: serializa arrays NumPy directamente
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Importar módulos
 from geometry_setup_hexagon import create_hexagonal_bioreactor_geometry
 from material_properties_hexagon import HexagonalMaterialProperties
 
+
+class _RankZeroFilter(logging.Filter):
+    """Deja pasar solo los mensajes del rank 0 (evita líneas repetidas con MPI)"""
+    
+    def filter(self, record):
+        return MPI.COMM_WORLD.rank == 0
+
+
+# Los handlers los configura el script que se ejecute (bloques __main__)
+logger = logging.getLogger(__name__)
+logger.addFilter(_RankZeroFilter())
+
+
+@njit(cache=True)
+def reduce_T(arr):
+    """
+    Mínimo, máximo y promedio de temperatura en una sola pasada
+    """
+    tmin = arr[0]
+    tmax = arr[0]
+    total = 0.0
+    for i in range(arr.size):
+        value = arr[i]
+        if value < tmin:
+            tmin = value
+        if value > tmax:
+            tmax = value
+        total += value
+    return tmin, tmax, total / arr.size
+
+
+if not NUMBA_AVAILABLE:
+    def reduce_T(arr):
+        """Mínimo, máximo y promedio de temperatura (NumPy)"""
+        return arr.min(), arr.max(), arr.mean()
+
+
 class HexagonalBioreactorThermalModel:
     """
     Modelo térmico del tambor hexagonal
@@ -51,7 +111,8 @@ class HexagonalBioreactorThermalModel:
         # Estado de rotación
         self.is_rotating = False
         self.rotation_schedule = self._create_rotation_schedule()
-        self.rotations_completed = set()  # Para evitar duplicados
+        self._sched_arr = np.asarray(self.rotation_schedule, dtype=np.float64)
+        self._next_rot_idx = 0  # Próxima rotación pendiente (cronograma ordenado)
         
     def setup_hexagonal_geometry(self):
         """Configura geometría"""
@@ -113,81 +174,87 @@ class HexagonalBioreactorThermalModel:
         print(f"   - Límite seguro: {self.TEMP_MAX_SAFE - 273.15:.1f}°C")
         print(f"   - Parada de emergencia: {self.TEMP_EMERGENCY_STOP - 273.15:.1f}°C")
         
+        # Generación de calor precalculada (sin corrección por temperatura)
+        self._precompute_heat_schedule()
+        
+    def _precompute_heat_schedule(self):
+        """
+        Precalcula q_ferm(t) en una malla temporal para consultarla por np.interp
+        
+        El perfil es lineal por tramos, así que incluyendo sus quiebres
+        (12, 36, 84, 168 h) la interpolación reproduce la función exacta.
+        Fila 0: tambor quieto; fila 1: tambor rotando.
+        """
+        breakpoints = np.array([12.0, 36.0, 84.0, 168.0]) * 3600
+        t_grid = np.union1d(np.arange(0.0, self.t_final + self.dt, self.dt), breakpoints)
+        
+        # Una evaluación vectorizada por estado de rotación (t como array)
+        self._q_sched_t = t_grid
+        self._q_ferm_schedule = np.vstack([
+            self.mat_props.get_fermentation_heat_controlled(t_grid, None, 0.0, rotating)
+            for rotating in (False, True)
+        ])
+        
     def _create_rotation_schedule(self):
         """Crea cronograma de rotación (7 eventos exactos)"""
-        rotation_times = []
-        for day in range(1, 8):  # Días 1-7
-            rotation_times.append(day * 24 * 3600)
+        rotation_times = tuple((day + 1) * 86400 for day in range(7))  # Días 1-7
         
         print(f"🔄 Cronograma de rotación:")
         for i, t in enumerate(rotation_times):
-            print(f"   Rotación {i+1}: Día {day} ({t/3600:.0f}h)")
+            print(f"   Rotación {i+1}: Día {i+1} ({t/3600:.0f}h)")
         
         return rotation_times
         
     def _check_rotation_schedule(self):
-        """Verifica rotación SIN DUPLICADOS"""
-        for i, rotation_time in enumerate(self.rotation_schedule):
-            if (self.t >= rotation_time and 
-                i not in self.rotations_completed and
-                abs(self.t - rotation_time) <= self.dt):
-                self.rotations_completed.add(i)  # Marcar como completada
-                return True
+        """Verifica rotación SIN DUPLICADOS (puntero al próximo evento)"""
+        if (self._next_rot_idx < len(self.rotation_schedule) and
+                self.t >= self.rotation_schedule[self._next_rot_idx]):
+            self._next_rot_idx += 1
+            return True
         return False
         
     def _perform_rotation(self):
         """Simula rotación"""
         self.total_rotations_done += 1
-        print(f"\n🔄 ROTACIÓN #{self.total_rotations_done} a t={self.t/3600:.1f}h")
+        if self.comm.rank == 0:
+            logger.info("\n🔄 ROTACIÓN #%d a t=%.1fh", self.total_rotations_done, self.t/3600)
         
         self.is_rotating = True
         self.last_rotation_time = self.t
         
-        print(f"   ✅ Tambor rotado - Día {self.total_rotations_done}")
+        if self.comm.rank == 0:
+            logger.info("   ✅ Tambor rotado - Día %d", self.total_rotations_done)
         
-    def update_heat_generation(self):
+    def update_heat_generation(self, current_T_max, current_T_avg):
         """
         Actualiza generación de calor CONTROLADA (temperaturas realistas)
-        """
-        # Temperatura actual
-        current_T_max = np.max(self.T.x.array)
-        current_T_avg = np.mean(self.T.x.array)
-        
-        # Actualizar máxima
-        if current_T_max > self.max_temp_reached:
-            self.max_temp_reached = current_T_max
         
+        current_T_max, current_T_avg: estadísticas de la temperatura actual [K]
+        (calculadas una sola vez por paso en solve_transient)
+        """
         # VERIFICACIÓN DE SEGURIDAD TÉRMICA
         if current_T_max > self.TEMP_EMERGENCY_STOP:
-            print(f"🚨 PARADA DE EMERGENCIA: T={current_T_max-273.15:.1f}°C")
+            if self.comm.rank == 0:
+                logger.warning("🚨 PARADA DE EMERGENCIA: T=%.1f°C", current_T_max - 273.15)
             return 0.0, 0.0  # Parar generación de calor
         
         # Factor de rotación
         rotation_factor = 1.05 if self.is_rotating else 1.0
         
         # ENFRIAMIENTO EVAPORATIVO MEJORADO
-        q_evap_enhanced = self.mat_props.get_evaporative_cooling_enhanced(
+        q_evap_enhanced = self.mat_props.get_evaporative_cooling(
             current_T_avg, self.t, rotation_factor
         )
         
-        # GENERACIÓN DE CALOR CONTROLADA
-        q_current = self.mat_props.get_fermentation_heat_controlled(
-            self.t, current_T_max, q_evap_enhanced, self.is_rotating
-        )
-        
-        # Identificar celdas de cacao (marcador = 2)
-        cacao_indices = np.where(self.material_markers.values == 2)[0]
-        
-        # Aplicar valores
-        q_gen_values = np.where(self.material_markers.values == 2, 
-                               ScalarType(q_current), ScalarType(0.0))
-        
-        q_evap_values = np.zeros_like(self.material_markers.values, dtype=float)
-        q_evap_values[cacao_indices] = q_evap_enhanced
-        
-        # Asignar a funciones
-        self.q_function.x.array[:] = q_gen_values
-        self.q_evap_function.x.array[:] = q_evap_values
+        # GENERACIÓN DE CALOR CONTROLADA: tabla precalculada (factor de seguridad 1)
+        # salvo por encima del óptimo, donde se aplica la corrección por temperatura
+        if current_T_max > self.mat_props.thermal_limits['T_optimal_max']:
+            q_current = self.mat_props.get_fermentation_heat_controlled(
+                self.t, current_T_max, q_evap_enhanced, self.is_rotating
+            )
+        else:
+            q_current = float(np.interp(self.t, self._q_sched_t,
+                                        self._q_ferm_schedule[int(self.is_rotating)]))
         
         # Resetear rotación
         if self.is_rotating and self.t - self.last_rotation_time > self.dt:
@@ -203,41 +270,86 @@ class HexagonalBioreactorThermalModel:
         v = ufl.TestFunction(self.V)
         u = ufl.TrialFunction(self.V)
         
-        # Propiedades
+        # Propiedades: constantes por material, integradas en su subdominio
         k = self.props['k']
         rho = self.props['rho'] 
         cp = self.props['cp']
+        dx_m = self.props['dx']
+        tags = self.props['tags']
         
         # Condiciones ambientales
-        T_amb = Constant(self.domain, PETSc.ScalarType(self.mat_props.ambient['T_amb']))
-        h_conv = Constant(self.domain, PETSc.ScalarType(25.0))  # MEJORADO
-        dt = Constant(self.domain, PETSc.ScalarType(self.dt))
+        # Se guardan como atributos para cambiar su valor (.value) sin reconstruir formas
+        self._Tamb_const = Constant(self.domain, PETSc.ScalarType(self.mat_props.ambient['T_amb']))
+        self._hconv_const = Constant(self.domain, PETSc.ScalarType(25.0))  # MEJORADO
+        self._dt_const = Constant(self.domain, PETSc.ScalarType(self.dt))
+        T_amb = self._Tamb_const
+        h_conv = self._hconv_const
+        dt = self._dt_const
         
         # Medidas
         ds = ufl.ds(domain=self.domain)
         
-        # Funciones de fuente
-        Q = functionspace(self.domain, ("DG", 0))
-        self.q_function = Function(Q, name="Generacion_calor")
-        self.q_evap_function = Function(Q, name="Enfriamiento_evaporativo")
-        
         # FORMA VARIACIONAL ESTABLE
-        a = (rho * cp * u * v * dx + 
-             dt * inner(k * grad(u), grad(v)) * dx +
-             dt * h_conv * u * v * ds)
+        a = sum(rho[i] * cp[i] * u * v * dx_m(i) + 
+                dt * k[i] * inner(grad(u), grad(v)) * dx_m(i)
+                for i in tags) + dt * h_conv * u * v * ds
         
-        L = (rho * cp * self.T_n * v * dx + 
-             dt * self.q_function * v * dx -
-             dt * self.q_evap_function * v * dx +
-             dt * h_conv * T_amb * v * ds)
+        # Solo el término de masa depende de T_n; la convección (sin dt) se
+        # ensambla una vez y las fuentes se agregan por paso con el vector del cacao
+        L = sum(rho[i] * cp[i] * self.T_n * v * dx_m(i) for i in tags)
+        self._L_bc = h_conv * T_amb * v * ds
         
         print("✅ Forma variacional creada")
         
         return a, L
     
-    def solve_transient(self, save_interval=3600):
+    def _adapt_time_step(self, dT_dt, dt_min, dt_max, dT_tol):
+        """
+        Propone un nuevo paso de tiempo a partir de la tasa de cambio de T
+        
+        dt = c * tol / max|dT/dt|, acotado a [dt_min, dt_max] y recortado
+        para caer exactamente en la próxima rotación y en t_final.
+        """
+        new_dt = 0.9 * dT_tol / max(dT_dt, 1e-12)
+        new_dt = min(max(new_dt, dt_min), dt_max)
+        
+        # Solo cambiar si la variación es significativa (reensamblar A tiene costo)
+        if 0.8 <= new_dt / self.dt <= 1.25:
+            new_dt = self.dt
+        
+        # No saltarse rotaciones programadas ni el tiempo final
+        next_event = self.t_final
+        i = np.searchsorted(self._sched_arr, self.t + 1e-6, side='right')
+        if i < len(self._sched_arr):
+            next_event = min(next_event, self._sched_arr[i])
+        new_dt = min(new_dt, next_event - self.t)
+        
+        return new_dt
+    
+    def _set_time_step(self, new_dt, A, a_form, ksp):
+        """Actualiza dt en las formas y rehace el precondicionador"""
+        self.dt = new_dt
+        self._dt_const.value = new_dt
+        
+        A.zeroEntries()
+        assemble_matrix(A, a_form)
+        A.assemble()
+        
+        # Forzar nuevo setup del precondicionador con el operador actualizado
+        ksp.setReusePreconditioner(False)
+        ksp.setOperators(A)
+        ksp.setUp()
+        ksp.setReusePreconditioner(True)
+    
+    def solve_transient(self, save_interval=3600, adaptive_dt=True,
+                        dt_min=60.0, dt_max=1800.0, dT_tol=0.1, stats_interval=60.0):
         """
         Resuelve problema térmico
+        
+        Con adaptive_dt=True el paso se ajusta según max|dT/dt|:
+        dt_min/dt_max acotan el paso [s] y dT_tol es el cambio de
+        temperatura objetivo por paso [K]. Las estadísticas se registran
+        como máximo una vez cada stats_interval [s], independiente de dt.
         """
         print("\n🏃 Iniciando simulación...")
         print("🔧 Temperaturas realistas garantizadas")
@@ -246,29 +358,78 @@ class HexagonalBioreactorThermalModel:
         # Crear forma variacional
         a, L = self.create_variational_form()
         
-        # Configurar problema
-        problem = LinearProblem(a, L, bcs=[], 
-                               petsc_options={"ksp_type": "preonly", 
-                                            "pc_type": "lu"})
+        # Compilar formas
+        a_form = fem.form(a)
+        L_form = fem.form(L)
+        
+        # Doble buffer de temperatura: una forma de masa por buffer, de modo que
+        # avanzar en el tiempo sea intercambiar referencias y no copiar vectores
+        L_forms = {id(self.T_n): L_form,
+                   id(self.T): fem.form(ufl.replace(L, {self.T_n: self.T}))}
+        
+        # La matriz no depende del tiempo: ensamblar y preparar el solver UNA vez
+        A = assemble_matrix(a_form)
+        A.assemble()
+        b = create_vector(L_form)
+        
+        # Vector fijo del cacao: ∫_cacao v dx (marcador 2; independiente de dt y de q)
+        v_cacao = assemble_vector(fem.form(ufl.TestFunction(self.V) * self.props['dx'](2)))
+        v_cacao.ghostUpdate(addv=PETSc.InsertMode.ADD, mode=PETSc.ScatterMode.REVERSE)
+        
+        # Vector fijo de convección: ∫ h T_amb v ds (se escala por dt en cada paso)
+        b_bc = assemble_vector(fem.form(self._L_bc))
+        b_bc.ghostUpdate(addv=PETSc.InsertMode.ADD, mode=PETSc.ScatterMode.REVERSE)
+        
+        # Matriz SPD: CG + BoomerAMG, setup reutilizado en todos los pasos
+        # y arranque en caliente desde la solución anterior
+        ksp = PETSc.KSP().create(self.domain.comm)
+        ksp.setOperators(A)
+        ksp.setType(PETSc.KSP.Type.CG)
+        pc = ksp.getPC()
+        pc.setType(PETSc.PC.Type.HYPRE)
+        pc.setHYPREType("boomeramg")
+        ksp.setTolerances(rtol=1e-8)
+        ksp.setInitialGuessNonzero(True)
+        ksp.setReusePreconditioner(True)
         
         # Archivos de salida
         filename = os.path.join(self.results_dir, f"bioreactor_hexagon.xdmf")
         xdmf = XDMFFile(self.domain.comm, filename, "w")
         xdmf.write_mesh(self.domain)
         
-        # Arrays para estadísticas
-        times = []
-        T_max_values = []
-        T_min_values = []
-        T_avg_values = []
-        q_gen_values = []
-        q_evap_values = []
+        # Escritura asíncrona solo en serie: con varios rangos write_function es
+        # colectiva y no puede solaparse con las colectivas de PETSc del bucle
+        # (requeriría MPI_THREAD_MULTIPLE y HDF5 thread-safe), así que se escribe
+        # de forma síncrona en el hilo principal
+        writer = ThreadPoolExecutor(max_workers=1) if self.comm.size == 1 else None
+        write_future = None
+        T_out = Function(self.V, name="Temperatura")
+        T_last_written = None
+        
+        # Arrays preasignados para estadísticas (un registro por stats_interval
+        # como máximo, y nunca más que el número de pasos)
+        dt_floor = min(self.dt, dt_min) if adaptive_dt else self.dt
+        n_steps = (int(np.ceil((self.t_final - self.t) / dt_floor)) + 1 +
+                   len(self.rotation_schedule))
+        n_steps = min(n_steps, int(np.ceil((self.t_final - self.t) / stats_interval)) + 2)
+        self._times = np.empty(n_steps, dtype=np.float64)
+        self._Tmax = np.empty(n_steps, dtype=np.float64)
+        self._Tmin = np.empty(n_steps, dtype=np.float64)
+        self._Tavg = np.empty(n_steps, dtype=np.float64)
+        self._qgen = np.empty(n_steps, dtype=np.float64)
+        self._qevap = np.empty(n_steps, dtype=np.float64)
         
         # Control
         next_save = 0.0
+        next_log = 3600.0
+        next_stats = 0.0
         step = 0
+        n_rec = 0  # Pasos registrados
         emergency_stop = False
         
+        # Estadísticas de la condición inicial
+        T_min, T_max, T_avg = reduce_T(self.T.x.array)
+        
         # BUCLE TEMPORAL PRINCIPAL
         while self.t < self.t_final and not emergency_stop:
             self.t += self.dt
@@ -279,60 +440,129 @@ class HexagonalBioreactorThermalModel:
                 self._perform_rotation()
             
             # Actualizar calor CONTROLADO
-            q_gen, q_evap_avg = self.update_heat_generation()
+            q_gen, q_evap_avg = self.update_heat_generation(T_max, T_avg)
             
             # Resolver sistema
             try:
-                uh = problem.solve()
-                self.T.x.array[:] = uh.x.array[:]
+                # La solución anterior pasa a ser T_n; T se sobrescribe con el solve
+                self.T, self.T_n = self.T_n, self.T
+                
+                # Solo se re-ensambla el término de masa; el resto son AXPY
+                with b.localForm() as b_local:
+                    b_local.set(0.0)
+                assemble_vector(b, L_forms[id(self.T_n)])
+                b.ghostUpdate(addv=PETSc.InsertMode.ADD, mode=PETSc.ScatterMode.REVERSE)
+                b.axpy(self.dt, b_bc)
+                b.axpy(self.dt * (q_gen - q_evap_avg), v_cacao)
                 
-                # Estadísticas
-                T_array = self.T.x.array
-                T_max = np.max(T_array)
-                T_min = np.min(T_array)
-                T_avg = np.mean(T_array)
+                # Estimación inicial: extrapolación lineal 2*T_n - T_{n-1}
+                self.T.x.petsc_vec.axpby(2.0, -1.0, self.T_n.x.petsc_vec)
+                ksp.solve(b, self.T.x.petsc_vec)
+                # Solver iterativo: detener si no convergió (divergencia o max_it)
+                reason = ksp.getConvergedReason()
+                if reason < 0:
+                    raise RuntimeError(f"KSP no convergió (reason={reason}, "
+                                       f"iteraciones={ksp.getIterationNumber()})")
+                self.T.x.scatter_forward()
+                
+                # Estadísticas (una sola pasada sobre el vector de temperatura)
+                T_min, T_max, T_avg = reduce_T(self.T.x.array)
                 
                 # VERIFICACIÓN DE SEGURIDAD
                 if T_max > self.TEMP_EMERGENCY_STOP:
-                    print(f"\n🚨 PARADA DE EMERGENCIA a t={self.t/3600:.1f}h")
-                    print(f"   Temperatura: {T_max-273.15:.1f}°C")
+                    if self.comm.rank == 0:
+                        logger.warning("\n🚨 PARADA DE EMERGENCIA a t=%.1fh", self.t/3600)
+                        logger.warning("   Temperatura: %.1f°C", T_max - 273.15)
                     emergency_stop = True
                     break
                 
-                # Guardar estadísticas
-                times.append(self.t)
-                T_max_values.append(T_max - 273.15)
-                T_min_values.append(T_min - 273.15)
-                T_avg_values.append(T_avg - 273.15)
-                q_gen_values.append(q_gen)
-                q_evap_values.append(q_evap_avg)
+                # Guardar estadísticas (resolución stats_interval)
+                if self.t >= next_stats:
+                    next_stats = (np.floor(self.t / stats_interval) + 1) * stats_interval
+                    self._times[n_rec] = self.t
+                    self._Tmax[n_rec] = T_max - 273.15
+                    self._Tmin[n_rec] = T_min - 273.15
+                    self._Tavg[n_rec] = T_avg - 273.15
+                    self._qgen[n_rec] = q_gen
+                    self._qevap[n_rec] = q_evap_avg
+                    n_rec += 1
                 
                 # Progreso cada hora
-                if step % (3600 // self.dt) == 0:
-                    t_hours = self.t / 3600
-                    rotation_status = "🔄" if self.is_rotating else "⏸️"
-                    safety_status = "🔥" if T_max > self.TEMP_MAX_SAFE else "✅"
-                    
-                    print(f"  🛢️{rotation_status}{safety_status} t = {t_hours:6.1f}h | "
-                          f"T_max = {T_max-273.15:5.1f}°C | "
-                          f"T_avg = {T_avg-273.15:5.1f}°C | "
-                          f"q_gen = {q_gen:3.0f} W/m³ | "
-                          f"q_evap = {q_evap_avg:3.0f} W/m³")
+                if self.t >= next_log:
+                    next_log += 3600.0
+                    if self.comm.rank == 0:
+                        rotation_status = "🔄" if self.is_rotating else "⏸️"
+                        safety_status = "🔥" if T_max > self.TEMP_MAX_SAFE else "✅"
+                        
+                        logger.info("  🛢️%s%s t = %6.1fh | T_max = %5.1f°C | "
+                                    "T_avg = %5.1f°C | q_gen = %3.0f W/m³ | "
+                                    "q_evap = %3.0f W/m³",
+                                    rotation_status, safety_status, self.t / 3600,
+                                    T_max - 273.15, T_avg - 273.15, q_gen, q_evap_avg)
                 
                 # Guardar resultados
                 if self.t >= next_save:
-                    xdmf.write_function(self.T, self.t)
                     next_save += save_interval
+                    
+                    # Omitir si la temperatura apenas cambió desde la última escritura
+                    # (máximo global: todos los rangos deben decidir lo mismo)
+                    if T_last_written is None:
+                        dT_written = np.inf
+                    else:
+                        dT_written = self.comm.allreduce(
+                            np.max(np.abs(self.T.x.array - T_last_written), initial=0.0),
+                            op=MPI.MAX)
+                    if dT_written >= 0.05:
+                        if write_future is not None:
+                            write_future.result()
+                        T_out.x.array[:] = self.T.x.array
+                        T_last_written = T_out.x.array.copy()
+                        if writer is not None:
+                            write_future = writer.submit(xdmf.write_function, T_out, self.t)
+                        else:
+                            xdmf.write_function(T_out, self.t)
                 
-                # Actualizar solución anterior
-                self.T_n.x.array[:] = self.T.x.array
+                # Paso adaptativo según la tasa de cambio de temperatura (máximo
+                # global: _set_time_step es colectivo y dt debe ser igual en todos los rangos)
+                if adaptive_dt:
+                    dT_local = np.max(np.abs(self.T.x.array - self.T_n.x.array), initial=0.0)
+                    dT_dt = self.comm.allreduce(dT_local, op=MPI.MAX) / self.dt
+                    new_dt = self._adapt_time_step(dT_dt, dt_min, dt_max, dT_tol)
+                    if new_dt != self.dt and new_dt > 0:
+                        self._set_time_step(new_dt, A, a_form, ksp)
                 
             except Exception as e:
-                print(f"❌ Error en paso {step}: {e}")
+                logger.error("❌ Error en paso %d: %s", step, e)
                 break
         
-        # Cerrar archivo
+        # Esperar la última escritura antes de cerrar
+        if write_future is not None:
+            write_future.result()
+        if writer is not None:
+            writer.shutdown()
+        
+        # Cerrar archivo y liberar objetos PETSc
         xdmf.close()
+        ksp.destroy()
+        A.destroy()
+        b.destroy()
+        v_cacao.destroy()
+        b_bc.destroy()
+        
+        # Recortar series a los pasos registrados
+        times = self._times[:n_rec]
+        T_max_values = self._Tmax[:n_rec]
+        T_min_values = self._Tmin[:n_rec]
+        T_avg_values = self._Tavg[:n_rec]
+        q_gen_values = self._qgen[:n_rec]
+        q_evap_values = self._qevap[:n_rec]
+        
+        # Máxima alcanzada: una reducción sobre la serie (incluye el último paso,
+        # que no se registra si hubo parada de emergencia)
+        if n_rec > 0:
+            self.max_temp_reached = max(self.max_temp_reached,
+                                        float(T_max_values.max()) + 273.15)
+        self.max_temp_reached = max(self.max_temp_reached, float(T_max))
         
         # Resultados finales
         final_temp = self.max_temp_reached - 273.15
@@ -358,18 +588,34 @@ class HexagonalBioreactorThermalModel:
     
     def save_statistics(self, times, T_max, T_min, T_avg, q_gen, q_evap, emergency_stop):
         """Guarda estadísticas"""
-        import json
+        T_max = np.ascontiguousarray(T_max, dtype=np.float64)
+        T_min = np.ascontiguousarray(T_min, dtype=np.float64)
+        T_avg = np.ascontiguousarray(T_avg, dtype=np.float64)
+        q_gen = np.ascontiguousarray(q_gen, dtype=np.float64)
+        q_evap = np.ascontiguousarray(q_evap, dtype=np.float64)
+        
+        # Resumen de la serie completa (una pasada al final, no por paso)
+        has_data = T_max.size > 0
+        summary = {
+            'min_temp_celsius': float(T_min.min()) if has_data else None,
+            'mean_temp_celsius': float(T_avg.mean()) if has_data else None,
+            'max_heat_generation_W_m3': float(q_gen.max()) if has_data else None,
+            'mean_heat_generation_W_m3': float(q_gen.mean()) if has_data else None,
+            'mean_evaporative_cooling_W_m3': float(q_evap.mean()) if has_data else None,
+        }
         
+        # Las series se guardan como arrays; orjson las serializa sin listas intermedias
         stats = {
             'bioreactor_type': 'hexagon',
             'version': 'corrected_thermal_model',
-            'times_hours': [t/3600 for t in times],
+            'times_hours': np.ascontiguousarray(times, dtype=np.float64) / 3600,
             'T_max_celsius': T_max,
             'T_min_celsius': T_min,
             'T_avg_celsius': T_avg,
             'heat_generation_W_m3': q_gen,
             'evaporative_cooling_W_m3': q_evap,
             'max_temp_reached_celsius': float(self.max_temp_reached - 273.15),
+            'summary': summary,
             'total_rotations': self.total_rotations_done,
             'emergency_stop_occurred': emergency_stop,
             'fermentation_completed': not emergency_stop,
@@ -380,8 +626,14 @@ class HexagonalBioreactorThermalModel:
         }
         
         filename = os.path.join(self.results_dir, f"stats_hexagon.json")
-        with open(filename, 'w') as f:
-            json.dump(stats, f, indent=2)
+        if ORJSON_AVAILABLE:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(
+                    stats, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
+                ))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(stats, f, indent=2, default=lambda o: o.tolist())
         
         print(f"📊 Estadísticas guardadas en: {filename}")
 
@@ -404,6 +656,7 @@ def run_simulation():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     model, times, T_max, T_min, T_avg = run_simulation()
     
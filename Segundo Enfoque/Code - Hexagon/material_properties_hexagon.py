@@ -3,10 +3,163 @@ material_properties_hexagon.py
 
 """
 
+import logging
+import math
+from collections import deque
 import numpy as np
-from dolfinx.fem import Function, functionspace
+from dolfinx.fem import Constant
+from dolfinx.mesh import meshtags
+from petsc4py.PETSc import ScalarType
 import ufl
 
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit cuando Numba no está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# numexpr es opcional: evalúa expresiones de arrays en varios hilos
+try:
+    import numexpr
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+
+# Resúmenes por logging: los mensajes DEBUG no se formatean si no se muestran.
+# Los handlers los configura el script que se ejecute (bloques __main__)
+logger = logging.getLogger(__name__)
+
+
+# Perfil base de calor [W/m³] en función de th = t [h] (mismos tramos que
+# _get_controlled_heat_profile), como una sola expresión para numexpr
+_HEAT_PROFILE_EXPR = (
+    "where(th < 12, 90 + 40 * th / 12,"
+    " where(th < 36, 130 + 90 * (th - 12) / 24,"
+    " where(th < 84, 220 + 100 * (th - 36) / 48,"
+    " where(th < 168, 320 - 100 * (th - 84) / 84, 180.0))))"
+)
+
+# Constantes del modelo de convección natural y transferencia de masa
+_GR_COEFF = 9.81 * 0.8**3 / 1.5e-5**2   # g·L³/ν² (L = 0.8 m longitud característica)
+_M_OVER_R = 0.018 / 8314                # M_agua / R
+
+# Tabla de mejora por flotabilidad: ΔT = T - T_amb en [0, 40] K cada 0.1 K
+# (en el primer intervalo se evalúa la fórmula exacta)
+_GR_CRIT = 1e4
+_ENH_DT = 0.1
+_ENH_INV_DT = 1.0 / _ENH_DT
+_ENH_N = int(round(40.0 * _ENH_INV_DT)) + 1
+
+
+def _enhancement_table(T_amb, buoyancy):
+    """
+    Mejora por convección natural (Grashof) tabulada en T_amb + [0, 40] K;
+    por encima de 40 K se usa el último valor (la mejora ya está saturada)
+    """
+    delta_T = _ENH_DT * np.arange(_ENH_N)
+    Gr = _GR_COEFF * delta_T / (T_amb + delta_T)
+    return np.where(Gr > _GR_CRIT,
+                    np.minimum(1.0 + 0.5 * np.log10(np.maximum(Gr, _GR_CRIT) / _GR_CRIT),
+                               buoyancy),
+                    1.0)
+
+
+@njit(inline='always', cache=True)
+def _lookup_enhancement(delta_T, T_amb, enh_grid):
+    """
+    Mejora por flotabilidad (delta_T > 0): fórmula exacta por debajo del primer
+    nodo no nulo, donde el umbral Gr = 1e4 y la saturación quedan muy por
+    debajo de 0.1 K; interpolación lineal en la tabla por encima.
+    El tope es enh_grid[1]: la fórmula crece con delta_T, así que
+    min(fórmula, buoyancy) = min(fórmula, enh_grid[1]) en ese intervalo
+    """
+    s = delta_T * _ENH_INV_DT
+    if s < 1.0:
+        Gr = _GR_COEFF * delta_T / (T_amb + delta_T)
+        if Gr <= _GR_CRIT:
+            return 1.0
+        return min(1.0 + 0.5 * math.log10(Gr / _GR_CRIT), enh_grid[1])
+    n = enh_grid.size - 1
+    if s >= n:
+        return enh_grid[n]
+    i = int(s)
+    return enh_grid[i] + (s - i) * (enh_grid[i + 1] - enh_grid[i])
+
+
+@njit(fastmath=True, cache=True)
+def _evap_kernel(T, a_w, moisture_factor, P_vapor_amb, T_amb,
+                 L_vap, a_specific, h_mass0, enh_grid, conv_factor, cap):
+    """
+    Enfriamiento evaporativo [W/m³] a la temperatura T [K]
+    """
+    T_celsius = T - 273.15
+    
+    # Presión de vapor (math.* en escalares: sin despacho de ufuncs fuera de Numba)
+    if T_celsius > 0:
+        P_sat = 610.78 * math.exp(17.27 * T_celsius / (T_celsius + 237.3))
+    else:
+        P_sat = 610.78
+    
+    delta_P = a_w * P_sat - P_vapor_amb
+    if delta_P <= 0:
+        return 0.0
+    
+    # CONVECCIÓN (factor clave para enfriamiento)
+    enhancement = 1.0
+    delta_T = T - T_amb
+    if delta_T > 0:
+        enhancement = _lookup_enhancement(delta_T, T_amb, enh_grid) * conv_factor
+    
+    m_evap = h_mass0 * enhancement * (_M_OVER_R / T) * delta_P * moisture_factor
+    return min(m_evap * L_vap * a_specific, cap)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _evap_kernel_vec(T_arr, out, a_w, moisture_factor, P_vapor_amb, T_amb,
+                     L_vap, a_specific, h_mass0, enh_grid, conv_factor, cap):
+    """
+    Enfriamiento evaporativo [W/m³] elemento a elemento en un bucle paralelo
+    """
+    for i in prange(T_arr.size):
+        out[i] = _evap_kernel(T_arr[i], a_w, moisture_factor, P_vapor_amb, T_amb,
+                              L_vap, a_specific, h_mass0, enh_grid, conv_factor, cap)
+
+
+if not NUMBA_AVAILABLE:
+    _ENH_IDX = np.arange(_ENH_N, dtype=np.float64)
+
+    def _evap_kernel_vec(T_arr, out, a_w, moisture_factor, P_vapor_amb, T_amb,
+                         L_vap, a_specific, h_mass0, enh_grid, conv_factor, cap):
+        """Enfriamiento evaporativo [W/m³] elemento a elemento (NumPy)"""
+        T_celsius = T_arr - 273.15
+        P_sat = np.where(T_celsius > 0,
+                         610.78 * np.exp(17.27 * T_celsius / (T_celsius + 237.3)),
+                         610.78)
+        delta_P = a_w * P_sat - P_vapor_amb
+        
+        delta_T = T_arr - T_amb
+        s = np.maximum(delta_T, 0.0) * _ENH_INV_DT
+        Gr = _GR_COEFF * delta_T / (T_amb + np.maximum(delta_T, 0.0))
+        near = np.where(Gr > _GR_CRIT,
+                        np.minimum(1.0 + 0.5 * np.log10(np.maximum(Gr, _GR_CRIT) / _GR_CRIT),
+                                   enh_grid[1]),
+                        1.0)
+        enhancement = np.where(s < 1.0, near, np.interp(s, _ENH_IDX, enh_grid))
+        enhancement = np.where(delta_T > 0, enhancement * conv_factor, 1.0)
+        
+        m_evap = h_mass0 * enhancement * (_M_OVER_R / T_arr) * delta_P * moisture_factor
+        out[:] = np.where(delta_P > 0, np.minimum(m_evap * L_vap * a_specific, cap), 0.0)
+
+
 class HexagonalMaterialProperties:
     """
     Clase para propiedades térmicas
@@ -60,6 +213,11 @@ class HexagonalMaterialProperties:
             'wind_speed': 0.5
         }
         
+        # Presión de vapor ambiente (constante durante la simulación)
+        T_amb_celsius = self.ambient['T_amb'] - 273.15
+        self._P_sat_amb = 610.78 * math.exp(17.27 * T_amb_celsius / (T_amb_celsius + 237.3))
+        self._P_vapor_ambient = self.ambient['RH'] * self._P_sat_amb
+        
         # LÍMITES TÉRMICOS DE SEGURIDAD)
         self.thermal_limits = {
             'T_safe_max': 55.0 + 273.15,    # 55°C máximo seguro
@@ -93,6 +251,14 @@ class HexagonalMaterialProperties:
             'geometry_bonus': 1.2,  
         }
         
+        # Límite de evaporación por humedad: q_max = moisture_fraction * _evap_cap_coeff
+        # (1500 kg/m³ de agua evaporables en 7 días)
+        self._evap_cap_coeff = 1500.0 * self.ventilation['L_vap'] / (7 * 24 * 3600)
+        
+        # Mejora por flotabilidad tabulada en ΔT (solo depende de T)
+        self._enh_grid = _enhancement_table(self.ambient['T_amb'],
+                                            self.ventilation['buoyancy_enhancement'])
+        
         # CONTROL DE FERMENTACIÓN (CORREGIDO)
         self.fermentation_control = {
             'smart_heat_management': True,
@@ -101,7 +267,7 @@ class HexagonalMaterialProperties:
             'rotation_stress_factor': 1.0,
             'no_death_mode': True,
             'temperature_safety_mode': True,  
-            'max_heat_generation': 999.0,   LÍMITE [W/m³]
+            'max_heat_generation': 999.0,   # LÍMITE [W/m³]
         }
         
         # Estado microbiano
@@ -116,20 +282,23 @@ class HexagonalMaterialProperties:
             'safety_mode_active': False  
         }
         
-        # Variables para seguimiento
-        self._current_evap_values = []
+        # Variables para seguimiento (últimos 100 valores)
+        self._current_evap_values = deque(maxlen=100)
         
-        print("🔧 PROPIEDADES TÉRMICAS:")
-        print(f"   ✅ Generación de calor: LIMITADA a {self.fermentation_control['max_heat_generation']} W/m³")
-        print(f"   ✅ Enfriamiento: {self.ventilation['enhanced_h_conv']} W/m²·K")
-        print(f"   ✅ Factor de reducción: {self.fermentation_control['heat_reduction_factor']}")
-        print(f"   ✅ Límite seguro: {self.thermal_limits['T_safe_max']-273.15:.1f}°C")
+        logger.info("🔧 PROPIEDADES TÉRMICAS:")
+        logger.info("   ✅ Generación de calor: LIMITADA a %s W/m³", self.fermentation_control['max_heat_generation'])
+        logger.info("   ✅ Enfriamiento: %s W/m²·K", self.ventilation['enhanced_h_conv'])
+        logger.info("   ✅ Factor de reducción: %s", self.fermentation_control['heat_reduction_factor'])
+        logger.info("   ✅ Límite seguro: %.1f°C", self.thermal_limits['T_safe_max']-273.15)
         
     def _calculate_diffusivities(self):
         """Calcula difusividades térmicas"""
         self.wood['alpha'] = self.wood['k'] / (self.wood['rho'] * self.wood['cp'])
         self.cacao['alpha'] = self.cacao['k'] / (self.cacao['rho'] * self.cacao['cp'])
         self.air['alpha'] = self.air['k'] / (self.air['rho'] * self.air['cp'])
+        
+        # Área específica de evaporación [m²/m³] (d_bean = 0.01 m)
+        self._a_specific = 8 * (1 - self.cacao['porosity']) / 0.01
     
     def get_evaporative_cooling(self, T, t, rotation_factor=1.0):
         """
@@ -138,126 +307,103 @@ class HexagonalMaterialProperties:
         if not self.ventilation['evaporation_enabled']:
             return 0.0
         
-        T_celsius = T - 273.15
+        q_evap = float(_evap_kernel(float(T), *self._evap_coefficients(t, rotation_factor)))
         
-        # Contenido de humedad con tiempo
-        t_days = t / (24 * 3600)
-        moisture_fraction = (self.cacao['moisture_content_initial'] - 
-                           (self.cacao['moisture_content_initial'] - self.cacao['moisture_content_final']) * 
-                           min(t_days / 7.0, 1.0))
-        
-        moisture_factor = max(0.1, moisture_fraction / self.cacao['moisture_content_initial'])
-        
-        # Presión de vapor
-        if T_celsius > 0:
-            P_sat = 610.78 * np.exp(17.27 * T_celsius / (T_celsius + 237.3))
-        else:
-            P_sat = 610.78
+        # Guardar para seguimiento (solo pasos con gradiente de vapor, q_evap > 0)
+        if q_evap > 0.0:
+            self._current_evap_values.append(q_evap)
         
-        a_w = self.cacao['water_activity'] * (0.7 + 0.3 * (1 - t_days/7.0))
-        P_vapor_surface = a_w * P_sat
-        
-        T_amb_celsius = self.ambient['T_amb'] - 273.15
-        P_sat_amb = 610.78 * np.exp(17.27 * T_amb_celsius / (T_amb_celsius + 237.3))
-        P_vapor_ambient = self.ambient['RH'] * P_sat_amb
-        
-        delta_P = P_vapor_surface - P_vapor_ambient
-        if delta_P <= 0:
-            return 0.0
-        
-        # CONVECCIÓN (factor clave para enfriamiento)
-        delta_T = T - self.ambient['T_amb']
-        if delta_T > 0:
-            g = 9.81
-            beta = 1 / T
-            L_char = 0.8  
-            nu = 1.5e-5
-            
-            Gr = g * beta * delta_T * L_char**3 / nu**2
-            
-            if Gr > 1e4:
-                enhancement = 1.0 + 0.5 * np.log10(Gr / 1e4) 
-                enhancement = min(enhancement, self.ventilation['buoyancy_enhancement'])
-            else:
-                enhancement = 1.0
-            
-            # FACTORES DE MEJORA APLICADOS
-            enhancement *= self.ventilation['drum_convection_factor']
-            enhancement *= self.ventilation['geometry_bonus']
-            
-            # Factor por rotación )
-            if rotation_factor > 1.0:
-                enhancement *= rotation_factor * self.ventilation['rotation_mixing_factor'] * self.ventilation['daily_rotation_bonus']
-            else:
-                enhancement *= self.ventilation['rotation_mixing_factor']
-        else:
-            enhancement = 1.0
-        
-        # COEFICIENTE 
-        h_mass = self.ventilation['mass_transfer_coeff_natural'] * enhancement
-        
-        # Densidad del aire
-        rho_air = self.ambient['P_atm'] / (287.05 * T)
-        
-        # Tasa de evaporación
-        M_water = 0.018
-        R = 8314
+        return q_evap
+    
+    def get_evaporative_cooling_vec(self, T_arr, t, rotation_factor=1.0):
+        """
+        Enfriamiento evaporativo para un array de temperaturas (misma física
+        que get_evaporative_cooling, sin registrar valores de seguimiento)
+        """
+        T_arr = np.ascontiguousarray(T_arr, dtype=np.float64)
+        if not self.ventilation['evaporation_enabled']:
+            return np.zeros_like(T_arr)
         
-        m_evap = h_mass * (M_water / (R * T)) * delta_P * moisture_factor
+        q_evap = np.empty_like(T_arr)
+        _evap_kernel_vec(T_arr.ravel(), q_evap.ravel(),
+                         *self._evap_coefficients(t, rotation_factor))
+        return q_evap
+    
+    def _evap_coefficients(self, t, rotation_factor=1.0):
+        """
+        Coeficientes escalares de evaporación en el tiempo t (argumentos de los kernels)
+        """
+        # Parámetros como locales (una lectura de cada diccionario)
+        cacao = self.cacao
+        vent = self.ventilation
+        moist_init = cacao['moisture_content_initial']
+        moist_final = cacao['moisture_content_final']
+        L_vap = vent['L_vap']
         
-        # Área específica 
-        d_bean = 0.01
-        a_specific = 8 * (1 - self.cacao['porosity']) / d_bean 
+        # Contenido de humedad con tiempo
+        t_days = t / (24 * 3600)
+        moisture_fraction = (moist_init - (moist_init - moist_final) * 
+                           min(t_days / 7.0, 1.0))
         
-        # Factor de exposición
-        exposure_factor = 1.2 
+        moisture_factor = max(0.1, moisture_fraction / moist_init)
         
-        # Flujo de calor evaporativo
-        q_evap = m_evap * self.ventilation['L_vap'] * a_specific * exposure_factor
+        a_w = cacao['water_activity'] * (0.7 + 0.3 * (1 - t_days/7.0))
         
-        # LÍMITES
-        max_evap_rate = moisture_fraction * 1500 
-        max_q_evap = (max_evap_rate / (7 * 24 * 3600)) * self.ventilation['L_vap']
+        # FACTORES DE MEJORA APLICADOS (convección en tambor, geometría y rotación)
+        conv_factor = vent['drum_convection_factor'] * vent['geometry_bonus'] * vent['rotation_mixing_factor']
+        if rotation_factor > 1.0:
+            conv_factor *= rotation_factor * vent['daily_rotation_bonus']
         
-        q_evap = min(q_evap, max_q_evap)
-        q_evap = min(q_evap, 200.0)  
+        # Área específica por factor de exposición (1.2)
+        a_specific = self._a_specific * 1.2
         
-        # Guardar para seguimiento
-        self._current_evap_values.append(q_evap)
-        if len(self._current_evap_values) > 100:
-            self._current_evap_values.pop(0)
+        # LÍMITES (humedad disponible y máximo absoluto, un solo tope)
+        cap = min(moisture_fraction * self._evap_cap_coeff, 200.0)
         
-        return q_evap
+        return (a_w, moisture_factor, self._P_vapor_ambient, self.ambient['T_amb'],
+                L_vap, a_specific, vent['mass_transfer_coeff_natural'],
+                self._enh_grid, conv_factor, cap)
     
     def get_fermentation_heat_controlled(self, t, current_T_max=None, evap_cooling=0, is_rotating=False):
         """
         Generación de calor CONTROLADA
+        
+        Acepta escalares o arrays (t y/o current_T_max); con arrays devuelve un array.
         """
+        control = self.fermentation_control
+        
         # Verificar límites de seguridad térmica
         if current_T_max is not None:
+            limits = self.thermal_limits
+            T = np.asarray(current_T_max, dtype=np.float64)
+            safety_factor = np.where(T > limits['T_safe_max'], 0.3,
+                                     np.where(T > limits['T_optimal_max'], 0.9, 1.0))
 
             # Actualizar estado sin muerte
             self.microbial_state['is_alive'] = True
-            self.microbial_state['activity_factor'] = safety_factor
+            self.microbial_state['activity_factor'] = float(np.min(safety_factor))
 
         else:
             safety_factor = 1.0
         
         # Obtener calor base CONTROLADO
-        q_base = self._get_controlled_heat_profile(t)
+        if np.ndim(t):
+            q_base = self._get_controlled_heat_profile_vec(np.asarray(t, dtype=np.float64) / 3600.0)
+        else:
+            q_base = self._get_controlled_heat_profile(t)
         
         # APLICAR CONTROLES ESTRICTOS
-        q_base *= self.fermentation_control['heat_reduction_factor']  # 0.75
-        q_base *= safety_factor  # Factor de seguridad térmica
+        q_base = q_base * control['heat_reduction_factor']  # 0.75
+        q_base = q_base * safety_factor  # Factor de seguridad térmica
         
         # LÍMITE MÁXIMO ABSOLUTO
-        q_base = min(q_base, self.fermentation_control['max_heat_generation'])
+        q_base = np.minimum(q_base, control['max_heat_generation'])
         
         # Factor por rotación (leve beneficio)
         if is_rotating:
-            q_base *= 1.02  # Muy leve aumento
+            q_base = q_base * 1.02  # Muy leve aumento
         
-        return q_base
+        return q_base if np.ndim(q_base) else float(q_base)
     
     def _get_controlled_heat_profile(self, t):
         """
@@ -285,25 +431,42 @@ class HexagonalMaterialProperties:
         
         return q
     
+    def _get_controlled_heat_profile_vec(self, t_hours_arr):
+        """
+        Perfil de calor base para un array de tiempos [h] (mismos tramos)
+        """
+        h = np.asarray(t_hours_arr, dtype=np.float64)
+        if NUMEXPR_AVAILABLE:
+            return numexpr.evaluate(_HEAT_PROFILE_EXPR, local_dict={'th': h})
+        return np.piecewise(
+            h,
+            [h < 12, (h >= 12) & (h < 36), (h >= 36) & (h < 84), (h >= 84) & (h < 168)],
+            [lambda h: 90.0 + (130.0 - 90.0) * (h / 12.0),
+             lambda h: 130.0 + (220.0 - 130.0) * ((h - 12.0) / 24.0),
+             lambda h: 220.0 + (320.0 - 220.0) * ((h - 36.0) / 48.0),
+             lambda h: 320.0 - (320.0 - 220.0) * ((h - 84.0) / 84.0),
+             180.0]
+        )
+    
     def get_current_evap_values(self):
         """Retorna valores actuales de evaporación"""
-        return self._current_evap_values if self._current_evap_values else [0.0]
+        return list(self._current_evap_values) or [0.0]
     
     def create_hexagonal_material_functions(self, domain, material_markers):
         """
-        Crea funciones de material para el tambor hexagonal
+        Crea las propiedades de material para el tambor hexagonal
         CORREGIDO: Para masa exacta de 300 kg
-        """
-        # Crear espacio de funciones
-        Q = functionspace(domain, ("DG", 0))
         
-        # Crear funciones
-        k_func = Function(Q, name="Conductividad")
-        rho_func = Function(Q, name="Densidad")
-        cp_func = Function(Q, name="Calor_especifico")
+        Cada material es constante en su subdominio: en vez de funciones DG0
+        se devuelven Constants por marcador y la medida dx con los marcadores
+        de celda, para integrar cada material con dx(tag).
+        """
+        # Normalizar marcadores: toda celda sin marcar o con marcador fuera de
+        # 1..3 pasa a aire (3), el material por defecto
+        material_markers = self._normalize_cell_tags(domain, material_markers)
         
-        # Obtener marcadores
-        markers = material_markers.values
+        # Medida por subdominio (1 = madera, 2 = cacao, 3 = aire)
+        dx_tags = ufl.Measure("dx", domain=domain, subdomain_data=material_markers)
         
         # CORRECCIÓN IMPORTANTE: Ajustar densidad del cacao para 300 kg exactos
         # Volumen especificado: 0.517 m³
@@ -311,46 +474,60 @@ class HexagonalMaterialProperties:
         # Densidad = 300 kg / 0.517 m³ = 580 kg/m³
         densidad_cacao = 580.0  
         
-        # Asignar valores
-        k_values = np.select(
-            [markers == 1, markers == 2, markers == 3],
-            [self.wood['k'], self.cacao['k'], self.air['k']],
-            default=self.air['k']
-        )
-        
-        rho_values = np.select(
-            [markers == 1, markers == 2, markers == 3],
-            [self.wood['rho'], densidad_cacao, self.air['rho']],  # DENSIDAD
-            default=self.air['rho']
-        )
-        
-        cp_values = np.select(
-            [markers == 1, markers == 2, markers == 3],
-            [self.wood['cp'], self.cacao['cp'], self.air['cp']],
-            default=self.air['cp']
+        # Tabla de propiedades [k, rho, cp] indexada por marcador:
+        # 0 = aire (defecto), 1 = madera, 2 = cacao, 3 = aire
+        prop_table = np.array([
+            [self.air['k'], self.air['rho'], self.air['cp']],
+            [self.wood['k'], self.wood['rho'], self.wood['cp']],
+            [self.cacao['k'], densidad_cacao, self.cacao['cp']],  # DENSIDAD
+            [self.air['k'], self.air['rho'], self.air['cp']],
+        ], dtype=np.float64)
+        
+        # Constantes por material (una por marcador y propiedad)
+        tags = (1, 2, 3)
+        k_const, rho_const, cp_const = (
+            {tag: Constant(domain, ScalarType(prop_table[tag, j])) for tag in tags}
+            for j in range(3)
         )
         
-        # Asignar a funciones
-        k_func.x.array[:] = k_values
-        rho_func.x.array[:] = rho_values
-        cp_func.x.array[:] = cp_values
-        
-        print(f"\n📋 Propiedades asignadas:")
-        print(f"   Madera (tag 1): {self.wood['name']}")
-        print(f"   Cacao (tag 2): {self.cacao['name']} - Densidad: {densidad_cacao:.0f} kg/m³")
-        print(f"   Aire (tag 3): {self.air['name']}")
-        print(f"   ✅ Masa de cacao: 300 kg exactos")
-        print(f"   ✅ Generación controlada + Enfriamiento")
+        logger.info("\n📋 Propiedades asignadas:")
+        logger.info("   Madera (tag 1): %s", self.wood['name'])
+        logger.info("   Cacao (tag 2): %s - Densidad: %.0f kg/m³", self.cacao['name'], densidad_cacao)
+        logger.info("   Aire (tag 3): %s", self.air['name'])
+        logger.info("   ✅ Masa de cacao: 300 kg exactos")
+        logger.info("   ✅ Generación controlada + Enfriamiento")
         
         return {
-            'k': k_func,
-            'rho': rho_func,
-            'cp': cp_func,
+            'tags': tags,
+            'dx': dx_tags,
+            'k': k_const,
+            'rho': rho_const,
+            'cp': cp_const,
             'wood_material': self.wood,
             'cacao_material': self.cacao,
             'air_material': self.air
         }
     
+    @staticmethod
+    def _normalize_cell_tags(domain, material_markers, default_tag=3):
+        """
+        Retorna marcadores de celda que cubren todas las celdas con valores en 1..3
+        (los mismos marcadores si ya cumplen, sin reconstruir)
+        """
+        tdim = domain.topology.dim
+        index_map = domain.topology.index_map(tdim)
+        num_cells = index_map.size_local + index_map.num_ghosts
+        
+        values = material_markers.values
+        out_of_range = (values < 1) | (values > 3)
+        if material_markers.indices.size == num_cells and not out_of_range.any():
+            return material_markers
+        
+        # Una sola pasada: valor por defecto y reemplazo de los marcadores válidos
+        tags = np.full(num_cells, default_tag, dtype=np.int32)
+        tags[material_markers.indices] = np.where(out_of_range, default_tag, values)
+        return meshtags(domain, tdim, np.arange(num_cells, dtype=np.int32), tags)
+    
     def reset_microbial_state(self):
         """Reinicia estado microbiano"""
         self.microbial_state = {
@@ -363,34 +540,34 @@ class HexagonalMaterialProperties:
             'death_disabled': True,
             'safety_mode_active': True
         }
-        self._current_evap_values = []
+        self._current_evap_values = deque(maxlen=100)
     
     def print_hexagonal_summary(self):
         """Imprime resumen de propiedades"""
-        print("\n" + "="*60)
-        print("PROPIEDADES TÉRMICAS - TAMBOR HEXAGONAL")
-        print("="*60)
-        
-        print(f"\n✅ CORRECCIONES APLICADAS:")
-        print(f"   - Generación máxima: {self.fermentation_control['max_heat_generation']} W/m³")
-        print(f"   - Enfriamiento: {self.ventilation['enhanced_h_conv']} W/m²·K")
-        print(f"   - Factor reducción: {self.fermentation_control['heat_reduction_factor']}")
-        print(f"   - Límite seguro: {self.thermal_limits['T_safe_max']-273.15:.1f}°C")
-        print(f"   - Masa cacao exacta: 300 kg")
-        
-        print(f"\n🔧 PARÁMETROSS:")
-        print(f"   - Factor convección: {self.ventilation['drum_convection_factor']:.1f}x")
-        print(f"   - Transferencia masa: {self.ventilation['mass_transfer_coeff_natural']:.4f}")
-        print(f"   - Bonus geometría: {self.ventilation['geometry_bonus']:.1f}x")
-        
-        print(f"\n✅ MODO SEGURIDAD TÉRMICA ACTIVO")
+        logger.info("\n%s", "=" * 60)
+        logger.info("PROPIEDADES TÉRMICAS - TAMBOR HEXAGONAL")
+        logger.info("=" * 60)
+        
+        logger.info("\n✅ CORRECCIONES APLICADAS:")
+        logger.info("   - Generación máxima: %s W/m³", self.fermentation_control['max_heat_generation'])
+        logger.info("   - Enfriamiento: %s W/m²·K", self.ventilation['enhanced_h_conv'])
+        logger.info("   - Factor reducción: %s", self.fermentation_control['heat_reduction_factor'])
+        logger.info("   - Límite seguro: %.1f°C", self.thermal_limits['T_safe_max']-273.15)
+        logger.info("   - Masa cacao exacta: 300 kg")
+        
+        logger.info("\n🔧 PARÁMETROSS:")
+        logger.info("   - Factor convección: %.1fx", self.ventilation['drum_convection_factor'])
+        logger.info("   - Transferencia masa: %.4f", self.ventilation['mass_transfer_coeff_natural'])
+        logger.info("   - Bonus geometría: %.1fx", self.ventilation['geometry_bonus'])
+        
+        logger.info("\n✅ MODO SEGURIDAD TÉRMICA ACTIVO")
 
 
 def test_properties():
     """Prueba las propiedades"""
     props = HexagonalMaterialProperties()
     
-    print("\n🧪 PROBANDO PROPIEDADES:")
+    logger.info("\n🧪 PROBANDO PROPIEDADES:")
     
     # Probar generación de calor en diferentes momentos
     test_times = [24, 48, 72, 96]  # horas
@@ -405,8 +582,10 @@ def test_properties():
             q_evap = props.get_evaporative_cooling(T_k, t_s, 1.0)
             balance = q_gen - q_evap
             
-            print(f"  t={t_h}h, T={T_c}°C: q_gen={q_gen:.0f} W/m³, q_evap={q_evap:.0f} W/m³, balance={balance:.0f} W/m³")
+            logger.debug("  t=%sh, T=%s°C: q_gen=%.0f W/m³, q_evap=%.0f W/m³, balance=%.0f W/m³", t_h, T_c, q_gen, q_evap, balance)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
     test_properties()
\ No newline at end of file
@@ -6,6 +6,7 @@ run_hexagon_analysis.py
 import os
 import sys
 import time
+import logging
 from datetime import datetime
 
 # Importar modelo
@@ -120,70 +121,65 @@ def main():
 
 def create_correction_report(model, times, T_max, T_min, T_avg, max_temp_final):
     """Crea reporte de la corrección aplicada"""
-    report_lines = []
-    report_lines.append("REPORTE - TAMBOR HEXAGONAL")
-    report_lines.append("="*60)
-    report_lines.append(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    report_lines.append("")
-    
-    # Correcciones aplicadas
-    report_lines.append("CORRECCIONES APLICADAS:")
-    report_lines.append("✅ Volúmenes exactos según documento:")
-    report_lines.append("   - Volumen interno: 0.748 m³")
-    report_lines.append("   - Volumen cacao: 0.517 m³")
-    report_lines.append("   - Masa cacao: 300 kg exactos")
-    report_lines.append("   - Densidad: 580 kg/m³")
-    report_lines.append("")
-    
-    report_lines.append("✅ Generación de calor controlada:")
-    report_lines.append("   - Límite máximo: 150 W/m³")
-    report_lines.append("   - Factor de reducción: 0.75x")
-    report_lines.append("   - Perfil temporal suavizado")
-    report_lines.append("")
-    
-    report_lines.append("✅ Enfriamiento evaporativo mejorado:")
-    report_lines.append("   - Coeficiente convección: 120 W/m²·K")
-    report_lines.append("   - Factor geométrico: 2.0x")
-    report_lines.append("   - Límite evaporación: 200 W/m³")
-    report_lines.append("")
-    
-    report_lines.append("✅ Rotación simplificada:")
-    report_lines.append("   - Eventos únicos: 7 rotaciones")
-    report_lines.append("   - Sin duplicados por paso temporal")
-    report_lines.append("   - Control de estado mejorado")
-    report_lines.append("")
-    
-    report_lines.append("✅ Límites de seguridad térmica:")
-    report_lines.append("   - Temperatura segura: <55°C")
-    report_lines.append("   - Parada emergencia: 60°C")
-    report_lines.append("   - Modo seguridad automático")
-    report_lines.append("")
-    
-    # Resultados finales
-    report_lines.append("RESULTADOS:")
-    report_lines.append(f"- Temperatura máxima final: {max_temp_final:.1f}°C")
-    
+    # Estado según la temperatura máxima final
     if max_temp_final < 50.0:
-        report_lines.append("- Estado: ✅ PERFECTO (<50°C)")
-        report_lines.append("- Fermentación: ÓPTIMA")
-        report_lines.append("- Implementación: RECOMENDADA")
+        status = ("- Estado: ✅ PERFECTO (<50°C)\n"
+                  "- Fermentación: ÓPTIMA\n"
+                  "- Implementación: RECOMENDADA")
     elif max_temp_final < 55.0:
-        report_lines.append("- Estado: ✅ EXCELENTE (<55°C)")
-        report_lines.append("- Fermentación: VIABLE")
-        report_lines.append("- Implementación: RECOMENDADA")
+        status = ("- Estado: ✅ EXCELENTE (<55°C)\n"
+                  "- Fermentación: VIABLE\n"
+                  "- Implementación: RECOMENDADA")
     else:
-        report_lines.append("- Estado: ⚠️ MEJORABLE")
-        report_lines.append("- Fermentación: REQUIERE MONITOREO")
-        report_lines.append("- Implementación: CON PRECAUCIONES")
+        status = ("- Estado: ⚠️ MEJORABLE\n"
+                  "- Fermentación: REQUIERE MONITOREO\n"
+                  "- Implementación: CON PRECAUCIONES")
+    
+    # Reporte completo como una sola cadena
+    report = f"""REPORTE - TAMBOR HEXAGONAL
+{"="*60}
+Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+CORRECCIONES APLICADAS:
+✅ Volúmenes exactos según documento:
+   - Volumen interno: 0.748 m³
+   - Volumen cacao: 0.517 m³
+   - Masa cacao: 300 kg exactos
+   - Densidad: 580 kg/m³
+
+✅ Generación de calor controlada:
+   - Límite máximo: 150 W/m³
+   - Factor de reducción: 0.75x
+   - Perfil temporal suavizado
+
+✅ Enfriamiento evaporativo mejorado:
+   - Coeficiente convección: 120 W/m²·K
+   - Factor geométrico: 2.0x
+   - Límite evaporación: 200 W/m³
+
+✅ Rotación simplificada:
+   - Eventos únicos: 7 rotaciones
+   - Sin duplicados por paso temporal
+   - Control de estado mejorado
+
+✅ Límites de seguridad térmica:
+   - Temperatura segura: <55°C
+   - Parada emergencia: 60°C
+   - Modo seguridad automático
+
+RESULTADOS:
+- Temperatura máxima final: {max_temp_final:.1f}°C
+{status}"""
     
-    # Guardar reporte
+    # Guardar reporte (una sola escritura)
     filename = os.path.join("results", "reporte_tambor.txt")
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(report_lines))
+    with open(filename, 'w', encoding='utf-8', buffering=65536) as f:
+        f.write(report)
     
     print(f"\n📝 Reporte guardado: {filename}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     try:
         success = main()
         if success:
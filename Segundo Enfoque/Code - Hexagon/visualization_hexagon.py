@@ -4,12 +4,199 @@ Visualización para TAMBOR HEXAGONAL REAL con GMSH
 AJUSTES: Para usar stats_hexagon.json y mostrar geometría real
 """
 
+import os
+import sys
 import numpy as np
+import matplotlib
+
+# Sin servidor gráfico (CI / ejecuciones por lotes): backend Agg, solo savefig
+_HEADLESS = (sys.platform.startswith('linux')
+             and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY'))
+if _HEADLESS:
+    matplotlib.use('Agg')
+
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.patches import Polygon, Circle
+from matplotlib.collections import PatchCollection, PolyCollection
 import json
-import os
+from functools import lru_cache
+
+# Numba es opcional: sin él se usa la ruta NumPy equivalente
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit cuando Numba no está instalado"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# orjson es opcional: decodifica los JSON de estadísticas más rápido
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+@lru_cache(maxsize=16)
+def _load_json(filepath, mtime):
+    """Lee y parsea un JSON; la clave incluye mtime para invalidar si cambia"""
+    if ORJSON_AVAILABLE:
+        with open(filepath, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(filepath, 'r') as f:
+        return json.load(f)
+
+
+def _number(data, key, default):
+    """Valor numérico de data[key]; default si falta, es None o no es número"""
+    value = data.get(key)
+    return value if isinstance(value, (int, float)) else default
+
+
+class HexStats:
+    """
+    Estadísticas de una simulación con tipos fijos: las comprobaciones de
+    None/tipo y la conversión de series a ndarray se hacen una vez al cargar
+    """
+    __slots__ = ('times', 'T_max', 'T_avg', 'T_min', 'q_gen', 'q_evap', 'moisture',
+                 'rotation_events', 'max_temp', 'death_time', 'thermal_death',
+                 'final_moisture_pct', 'drum_length', 'drum_diameter',
+                 'ventilation_fraction', 'total_rotations', 'cacao_fraction',
+                 'air_fraction', 'real_geometry', 'gmsh_generated')
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Construye HexStats a partir del dict del JSON de estadísticas"""
+        self = cls()
+        
+        # Series temporales (vacías si faltan)
+        for attr, key in (('times', 'times_hours'), ('T_max', 'T_max_celsius'),
+                          ('T_avg', 'T_avg_celsius'), ('T_min', 'T_min_celsius'),
+                          ('q_gen', 'heat_generation_W_m3'),
+                          ('q_evap', 'evaporative_cooling_W_m3'),
+                          ('moisture', 'moisture_loss_kg_m3')):
+            setattr(self, attr, np.asarray(data.get(key) or [], dtype=np.float32))
+        
+        # Eventos de rotación: float32, sin entradas nulas
+        rotations = np.asarray([np.nan if t is None else t
+                                for t in data.get('rotation_events_hours') or []],
+                               dtype=np.float32)
+        self.rotation_events = rotations[~np.isnan(rotations)]
+        
+        # Escalares
+        # nan si falta: cada gráfico/resumen aplica su propio valor por defecto
+        self.max_temp = _number(data, 'max_temp_reached_celsius', np.nan)
+        self.death_time = _number(data, 'death_time_hours', None)
+        self.thermal_death = bool(data.get('thermal_death_occurred', False))
+        self.final_moisture_pct = _number(data, 'final_moisture_loss_percent', 0.0)
+        self.drum_length = _number(data, 'drum_length_m', 1.8)
+        self.drum_diameter = _number(data, 'drum_diameter_m', 0.86)
+        self.ventilation_fraction = _number(data, 'ventilated_face_fraction', 0.5)
+        self.total_rotations = _number(data, 'total_rotations', 0)
+        self.cacao_fraction = _number(data, 'cacao_fraction_achieved', 0.7)
+        self.air_fraction = _number(data, 'air_fraction_achieved', 0.3)
+        self.real_geometry = bool(data.get('real_geometry', False))
+        self.gmsh_generated = bool(data.get('gmsh_generated', False))
+        return self
+
+
+# Humedad perdida [kg/m³] → % de la humedad inicial (40% de 910 kg/m³)
+_MOIST_SCALE = 100.0 / (0.40 * 910.0)
+
+
+@njit(fastmath=True, cache=True)
+def _balance_parts(q_gen, q_evap):
+    """
+    Balance neto q_gen - q_evap y sus partes positiva/negativa en una sola pasada
+    """
+    n = q_gen.size
+    balance = np.empty(n)
+    pos = np.empty(n, dtype=np.float32)
+    neg = np.empty(n, dtype=np.float32)
+    for i in range(n):
+        b = q_gen[i] - q_evap[i]
+        balance[i] = b
+        pos[i] = b if b >= 0.0 else 0.0
+        neg[i] = b if b < 0.0 else 0.0
+    return balance, pos, neg
+
+
+if not NUMBA_AVAILABLE:
+    def _balance_parts(q_gen, q_evap):
+        """Balance neto y sus partes positiva/negativa (NumPy)"""
+        balance = q_gen - q_evap
+        return (balance,
+                np.clip(balance, 0.0, None).astype(np.float32),
+                np.clip(balance, None, 0.0).astype(np.float32))
+
+
+# Máximo de vértices por serie en las gráficas (las series originales no se tocan)
+_PLOT_MAX_POINTS = 2000
+
+
+def _downsample(t, y, n=_PLOT_MAX_POINTS):
+    """Remuestrea (t, y) en una malla regular de n puntos si la serie es más densa"""
+    if len(t) <= n:
+        return t, y
+    ts = np.linspace(t[0], t[-1], n)
+    return ts, np.interp(ts, t, y)
+
+
+# Fases de fermentación: (inicio [h], fin [h], etiqueta, color)
+_FERMENTATION_PHASES = (
+    (0, 12, 'Inicial\n(Levaduras)', 'lightgreen'),
+    (12, 36, 'Fermentación\nrápida', 'yellow'),
+    (36, 84, 'Pico bacterial\n(BAA)', 'orange'),
+    (84, 168, 'Declive', 'lightcoral')
+)
+
+
+# Esquema del tambor: radios del hexágono (vista frontal) y corte 70/30
+_HEX_R_OUTER = 0.9
+_HEX_R_INNER = 0.7
+_HEX_Y_CUT = -0.2  # Línea de corte aproximada para 70%
+
+
+def _hexagon_vertices(radius):
+    """Vértices del hexágono regular de radio dado"""
+    a = np.linspace(0, 2*np.pi, 7)[:-1]
+    return np.column_stack([radius*np.cos(a), radius*np.sin(a)])
+
+
+def _cut_polygon(hex_inner, y_cut, below):
+    """
+    Polígono de la parte del hexágono por debajo (below=True) o por encima
+    de y = y_cut, con vértices ordenados; None si queda degenerado
+    """
+    # Aristas (p1 → p2) que cruzan la línea de corte
+    p1 = hex_inner
+    p2 = np.roll(hex_inner, -1, axis=0)
+    p1_below = p1[:, 1] <= y_cut
+    crossing = p1_below ^ (p2[:, 1] <= y_cut)
+    
+    # Intersección con y = y_cut (solo en las aristas que la cruzan)
+    a, b = p1[crossing], p2[crossing]
+    t = (y_cut - a[:, 1]) / (b[:, 1] - a[:, 1])
+    x_intersect = np.zeros(len(hex_inner))
+    x_intersect[crossing] = a[:, 0] + t * (b[:, 0] - a[:, 0])
+    
+    # Recorrido de aristas: por cada una, p1 (si está del lado pedido) y luego
+    # su intersección; el polígono sale ya ordenado (convexo), sin arctan2
+    candidates = np.empty((len(hex_inner), 2, 2))
+    candidates[:, 0] = p1
+    candidates[:, 1, 0] = x_intersect
+    candidates[:, 1, 1] = y_cut
+    keep = np.column_stack([p1_below == below, crossing]).ravel()
+    part = candidates.reshape(-1, 2)[keep]
+    
+    return part if len(part) >= 3 else None
+
 
 class HexagonalVisualizer:
     """Visualizador para tambor hexagonal REAL con GMSH"""
@@ -28,6 +215,15 @@ class HexagonalVisualizer:
             'real_geometry': '#FFD700'     # Dorado para geometría real
         }
         
+        # Geometría constante del esquema (se calcula una sola vez)
+        self._hex_outer = _hexagon_vertices(_HEX_R_OUTER)
+        self._hex_inner = _hexagon_vertices(_HEX_R_INNER)
+        self._hex_cacao = _cut_polygon(self._hex_inner, _HEX_Y_CUT, below=True)
+        self._hex_air = _cut_polygon(self._hex_inner, _HEX_Y_CUT, below=False)
+        
+        # Figura del análisis y artistas reutilizables (ver reuse_fig)
+        self._cached_fig = None
+        
     def check_available_files(self):
         """Verifica qué archivos están disponibles"""
         print("🔍 Verificando archivos disponibles en results/:")
@@ -71,17 +267,13 @@ class HexagonalVisualizer:
         print(f"✅ Cargando: {hexagon_file}")
         
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
+            data = HexStats.from_dict(_load_json(filename, os.path.getmtime(filename)))
                 
             # Verificar si es geometría REAL
-            is_geometry = data.get('real_geometry', False)
-            gmsh_generated = data.get('gmsh_generated', False)
-            
-            if is_geometry and gmsh_generated:
+            if data.real_geometry and data.gmsh_generated:
                 print(f"🛢️ Datos de TAMBOR HEXAGONAL REAL detectados")
                 print(f"   - Geometría: Hexágono 3D verdadero")
-                print(f"   - Distribución: {data.get('cacao_fraction_achieved', 0.7)*100:.0f}% cacao exacto")
+                print(f"   - Distribución: {data.cacao_fraction*100:.0f}% cacao exacto")
                 print(f"   - Generado con: GMSH")
             else:
                 print(f"📦 Datos de tambor hexagonal (aproximado/anterior)")
@@ -115,22 +307,23 @@ class HexagonalVisualizer:
         print(f"✅ Cargando para comparación: {box_file}")
         
         try:
-            with open(filename, 'r') as f:
-                return json.load(f)
+            return HexStats.from_dict(_load_json(filename, os.path.getmtime(filename)))
         except Exception as e:
             print(f"❌ Error cargando {box_file}: {e}")
             return None
     
-    def safe_get_value(self, data, key, default=0):
-        """Obtiene valor de forma segura, manejando None"""
-        if data is None:
-            return default
-        
-        value = data.get(key, default)
-        return default if value is None else value
-    
-    def plot_hexagonal_analysis(self):
-        """Crea gráficos especializados para el tambor hexagonal REAL"""
+    def plot_hexagonal_analysis(self, reuse_fig=False, fmt='png', dpi=150):
+        """
+        Crea gráficos especializados para el tambor hexagonal REAL
+        
+        reuse_fig : bool
+            Si True y hay una figura previa abierta, actualiza sus líneas con
+            set_data en lugar de reconstruir todos los artistas (útil al
+            generar muchas imágenes seguidas)
+        fmt, dpi : str, int
+            Formato ('png' o 'webp') y resolución de la imagen guardada;
+            para publicación usar fmt='png', dpi=300
+        """
         hexagon_stats = self.load_hexagon_stats()
         if hexagon_stats is None:
             print("❌ No se pueden crear gráficos sin datos del tambor")
@@ -139,8 +332,43 @@ class HexagonalVisualizer:
         box_stats = self.load_box_stats_for_comparison()
         
         # Detectar si es geometría real
-        is_geometry = hexagon_stats.get('real_geometry', False)
+        is_geometry = hexagon_stats.real_geometry
+        
+        # Series ya normalizadas al cargar
+        times = hexagon_stats.times
+        if len(times) == 0:
+            print("⚠️ No hay datos temporales para graficar")
+            return
+        
+        cached = self._cached_fig
+        if (reuse_fig and cached is not None and cached['is_geometry'] == is_geometry
+                and plt.fignum_exists(cached['fig'].number)):
+            self._update_analysis_figure(cached, hexagon_stats, box_stats)
+        else:
+            cached = self._build_analysis_figure(hexagon_stats, box_stats)
+            self._cached_fig = cached
+        fig = cached['fig']
+        
+        fig.tight_layout()
+        
+        # Guardar con nombre apropiado
+        filename_suffix = "" if is_geometry else "_aproximado"
+        filename = os.path.join(self.results_dir, f"analisis_tambor_hexagonal{filename_suffix}.{fmt}")
+        fig.savefig(filename, dpi=dpi, bbox_inches='tight',
+                    pil_kwargs={'quality': 88} if fmt == 'webp' else None)
+        print(f"📊 Análisis hexagonal guardado: {filename}")
+        
+        if not _HEADLESS:
+            plt.show()
+        
+        # Imprimir resumen
+        self._print_hexagonal_summary(hexagon_stats, box_stats, is_geometry)
+    
+    def _build_analysis_figure(self, hexagon_stats, box_stats):
+        """Construye la figura de 6 paneles y devuelve los artistas reutilizables"""
+        is_geometry = hexagon_stats.real_geometry
         title_suffix = "REAL (GMSH)" if is_geometry else "Aproximado"
+        c_real = self.colors['real_geometry']
         
         # Crear figura con 6 subplots
         fig = plt.figure(figsize=(18, 14))
@@ -157,33 +385,24 @@ class HexagonalVisualizer:
         fig.suptitle(f'Análisis Térmico - Tambor Hexagonal {title_suffix}', 
                     fontsize=16, fontweight='bold')
         
-        # Obtener datos de forma segura
-        times = np.array(hexagon_stats.get('times_hours', []))
-        T_max = np.array(hexagon_stats.get('T_max_celsius', []))
-        T_avg = np.array(hexagon_stats.get('T_avg_celsius', []))
-        T_min = np.array(hexagon_stats.get('T_min_celsius', []))
-        q_gen = np.array(hexagon_stats.get('heat_generation_W_m3', []))
-        q_evap = np.array(hexagon_stats.get('evaporative_cooling_W_m3', []))
-        
-        if len(times) == 0:
-            print("⚠️ No hay datos temporales para graficar")
-            plt.close(fig)
-            return
+        times = hexagon_stats.times
+        T_max = hexagon_stats.T_max
+        T_avg = hexagon_stats.T_avg
+        T_min = hexagon_stats.T_min
+        q_gen = hexagon_stats.q_gen
+        q_evap = hexagon_stats.q_evap
         
         # GRÁFICO 1: Evolución térmica con rotaciones
-        color_max = self.colors['real_geometry'] if is_geometry else 'red'
+        color_max = c_real if is_geometry else 'red'
         
-        ax1.plot(times, T_max, color=color_max, linewidth=2.5, label='T máxima')
-        ax1.plot(times, T_avg, 'b-', linewidth=2, label='T promedio')
-        ax1.plot(times, T_min, 'g-', linewidth=1.5, label='T mínima')
+        temp_lines = (
+            ax1.plot(times, T_max, color=color_max, linewidth=2.5, label='T máxima')[0],
+            ax1.plot(times, T_avg, 'b-', linewidth=2, label='T promedio')[0],
+            ax1.plot(times, T_min, 'g-', linewidth=1.5, label='T mínima')[0],
+        )
         
         # Marcar eventos de rotación
-        rotation_events = hexagon_stats.get('rotation_events_hours', [])
-        if rotation_events:
-            for rot_time in rotation_events:
-                if rot_time is not None:
-                    ax1.axvline(x=rot_time, color='orange', linestyle=':', linewidth=2, alpha=0.7)
-                    ax1.text(rot_time, max(T_max)*0.95, '🔄', fontsize=16, ha='center')
+        rotation_artists = self._mark_rotations(ax1, hexagon_stats)
         
         # Líneas de referencia térmicas
         ax1.axhline(y=50, color='red', linestyle='--', alpha=0.5, label='Límite ideal (50°C)')
@@ -198,22 +417,25 @@ class HexagonalVisualizer:
                      fontsize=14, fontweight='bold')
         ax1.legend(loc='upper left', ncol=3, fontsize=10)
         ax1.grid(True, alpha=0.3)
-        ax1.set_xlim(0, max(168, max(times) if len(times) > 0 else 168))
+        ax1.set_xlim(0, max(168, times.max()))
         
         # GRÁFICO 2: Balance térmico
+        balance_lines = ()
+        balance_fills = ()
         if len(q_gen) > 0 and len(q_evap) > 0:
-            balance = q_gen - q_evap
+            # Series remuestreadas (el balance es lineal: se calcula sobre ellas)
+            t_plot, q_gen = _downsample(times, q_gen)
+            _, q_evap = _downsample(times, q_evap)
+            balance, pos, neg = _balance_parts(q_gen, q_evap)
             
-            color_gen = self.colors['real_geometry'] if is_geometry else 'orange'
+            color_gen = c_real if is_geometry else 'orange'
             
-            ax2.plot(times, q_gen, color=color_gen, linewidth=2, label='Generación')
-            ax2.plot(times, -q_evap, 'cyan', linewidth=2, label='Evaporación')
-            ax2.plot(times, balance, 'purple', linewidth=2, linestyle='--', label='Balance neto')
-            
-            ax2.fill_between(times, 0, balance, where=(balance>=0), 
-                            color='red', alpha=0.3, label='Calentamiento')
-            ax2.fill_between(times, 0, balance, where=(balance<0), 
-                            color='blue', alpha=0.3, label='Enfriamiento')
+            balance_lines = (
+                ax2.plot(t_plot, q_gen, color=color_gen, linewidth=2, label='Generación')[0],
+                ax2.plot(t_plot, -q_evap, 'cyan', linewidth=2, label='Evaporación')[0],
+                ax2.plot(t_plot, balance, 'purple', linewidth=2, linestyle='--', label='Balance neto')[0],
+            )
+            balance_fills = self._fill_balance(ax2, t_plot, pos, neg)
         
         ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
         ax2.set_xlabel('Tiempo [horas]')
@@ -224,6 +446,78 @@ class HexagonalVisualizer:
         ax2.legend(fontsize=9)
         ax2.grid(True, alpha=0.3)
         
+        # GRÁFICOS 3-6: rotaciones, comparación, esquema y humedad
+        panels = (ax3, ax4, ax5, ax6)
+        self._draw_side_panels(panels, hexagon_stats, box_stats)
+        
+        return {'fig': fig, 'is_geometry': is_geometry,
+                'ax1': ax1, 'ax2': ax2, 'panels': panels,
+                'temp_lines': temp_lines, 'rotation_artists': rotation_artists,
+                'balance_lines': balance_lines, 'balance_fills': balance_fills}
+    
+    def _update_analysis_figure(self, cached, hexagon_stats, box_stats):
+        """Actualiza una figura ya construida con nuevos datos (set_data)"""
+        times = hexagon_stats.times
+        ax1, ax2 = cached['ax1'], cached['ax2']
+        
+        for line, series in zip(cached['temp_lines'],
+                                (hexagon_stats.T_max, hexagon_stats.T_avg, hexagon_stats.T_min)):
+            line.set_data(times, series)
+        
+        for artist in cached['rotation_artists']:
+            artist.remove()
+        cached['rotation_artists'] = self._mark_rotations(ax1, hexagon_stats)
+        
+        ax1.relim()
+        ax1.autoscale_view()
+        ax1.set_xlim(0, max(168, times.max()))
+        
+        # Balance: líneas por set_data; los rellenos se regeneran
+        for artist in cached['balance_fills']:
+            artist.remove()
+        cached['balance_fills'] = ()
+        q_gen, q_evap = hexagon_stats.q_gen, hexagon_stats.q_evap
+        if cached['balance_lines'] and len(q_gen) > 0 and len(q_evap) > 0:
+            t_plot, q_gen = _downsample(times, q_gen)
+            _, q_evap = _downsample(times, q_evap)
+            balance, pos, neg = _balance_parts(q_gen, q_evap)
+            for line, series in zip(cached['balance_lines'], (q_gen, -q_evap, balance)):
+                line.set_data(t_plot, series)
+            cached['balance_fills'] = self._fill_balance(ax2, t_plot, pos, neg)
+        ax2.relim()
+        ax2.autoscale_view()
+        
+        # Paneles secundarios: se limpian y redibujan
+        for ax in cached['panels']:
+            ax.cla()
+        self._draw_side_panels(cached['panels'], hexagon_stats, box_stats)
+    
+    def _mark_rotations(self, ax, hexagon_stats):
+        """Marca los eventos de rotación en la evolución térmica"""
+        artists = []
+        rotation_events = hexagon_stats.rotation_events
+        if rotation_events.size > 0:
+            # Líneas verticales de altura completa en una sola colección
+            artists.append(ax.vlines(rotation_events, 0, 1, transform=ax.get_xaxis_transform(),
+                                     color='orange', linestyle=':', linewidth=2, alpha=0.7))
+            y_icon = hexagon_stats.T_max.max()*0.95
+            artists.extend(ax.text(rot_time, y_icon, '🔄', fontsize=16, ha='center')
+                           for rot_time in rotation_events)
+        return artists
+    
+    def _fill_balance(self, ax, times, pos, neg):
+        """Rellenos de calentamiento/enfriamiento del balance térmico"""
+        # Rellenos rasterizados (líneas y texto siguen vectoriales)
+        return (ax.fill_between(times, 0, pos,
+                                color='red', alpha=0.3, label='Calentamiento', rasterized=True),
+                ax.fill_between(times, 0, neg,
+                                color='blue', alpha=0.3, label='Enfriamiento', rasterized=True))
+    
+    def _draw_side_panels(self, panels, hexagon_stats, box_stats):
+        """Dibuja los paneles 3-6 (rotaciones, comparación, esquema, humedad)"""
+        ax3, ax4, ax5, ax6 = panels
+        is_geometry = hexagon_stats.real_geometry
+        
         # GRÁFICO 3: Eventos de rotación
         self._plot_rotation_schedule(ax3, hexagon_stats)
         
@@ -234,47 +528,39 @@ class HexagonalVisualizer:
         self._draw_hexagonal_drum_schema(ax5, hexagon_stats, is_geometry)
         
         # GRÁFICO 6: Pérdida de humedad
-        moisture_data = hexagon_stats.get('moisture_loss_kg_m3', [])
-        if moisture_data:
-            moisture = np.array(moisture_data)
-            moisture_percent = (moisture / (0.40 * 910)) * 100
-            
-            color_moisture = self.colors['real_geometry'] if is_geometry else 'blue'
-            label_moisture = 'Tambor hexagonal REAL' if is_geometry else 'Tambor hexagonal'
-            
-            ax6.plot(times, moisture_percent, color=color_moisture, linewidth=2, label=label_moisture)
-            ax6.fill_between(times, 0, moisture_percent, alpha=0.3, color=color_moisture)
-            
-            # Comparar con caja si disponible
-            if box_stats and 'moisture_loss_kg_m3' in box_stats:
-                box_moisture = np.array(box_stats['moisture_loss_kg_m3'])
-                box_moisture_percent = (box_moisture / (0.40 * 910)) * 100
-                box_times = np.array(box_stats['times_hours'])
-                ax6.plot(box_times, box_moisture_percent, 'g--', linewidth=2, label='Caja (referencia)')
-            
-            ax6.axhline(y=33, color='red', linestyle='--', alpha=0.7)
-            ax6.text(100, 34, 'Objetivo: 33%\n(40% → 7%)', fontsize=9)
-            
-            ax6.set_xlabel('Tiempo [horas]')
-            ax6.set_ylabel('Humedad perdida [%]')
-            
-            humidity_title = "Pérdida de Humedad (Geometría Real)" if is_geometry else "Pérdida de Humedad"
-            ax6.set_title(humidity_title)
-            ax6.legend()
-            ax6.grid(True, alpha=0.3)
+        self._plot_moisture_loss(ax6, hexagon_stats, box_stats, is_geometry)
+    
+    def _plot_moisture_loss(self, ax6, hexagon_stats, box_stats, is_geometry):
+        """Pérdida de humedad del tambor (y de la caja si está disponible)"""
+        if hexagon_stats.moisture.size == 0:
+            return
         
-        plt.tight_layout()
+        times, moisture_percent = _downsample(hexagon_stats.times,
+                                              hexagon_stats.moisture * _MOIST_SCALE)
         
-        # Guardar con nombre apropiado
-        filename_suffix = "" if is_geometry else "_aproximado"
-        filename = os.path.join(self.results_dir, f"analisis_tambor_hexagonal{filename_suffix}.png")
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
-        print(f"📊 Análisis hexagonal guardado: {filename}")
+        color_moisture = self.colors['real_geometry'] if is_geometry else 'blue'
+        label_moisture = 'Tambor hexagonal REAL' if is_geometry else 'Tambor hexagonal'
         
-        plt.show()
+        ax6.plot(times, moisture_percent, color=color_moisture, linewidth=2, label=label_moisture)
+        ax6.fill_between(times, 0, moisture_percent, alpha=0.3, color=color_moisture,
+                         rasterized=True)
         
-        # Imprimir resumen
-        self._print_hexagonal_summary(hexagon_stats, box_stats, is_geometry)
+        # Comparar con caja si disponible
+        if box_stats is not None and box_stats.moisture.size > 0:
+            box_times, box_moisture_percent = _downsample(box_stats.times,
+                                                          box_stats.moisture * _MOIST_SCALE)
+            ax6.plot(box_times, box_moisture_percent, 'g--', linewidth=2, label='Caja (referencia)')
+        
+        ax6.axhline(y=33, color='red', linestyle='--', alpha=0.7)
+        ax6.text(100, 34, 'Objetivo: 33%\n(40% → 7%)', fontsize=9)
+        
+        ax6.set_xlabel('Tiempo [horas]')
+        ax6.set_ylabel('Humedad perdida [%]')
+        
+        humidity_title = "Pérdida de Humedad (Geometría Real)" if is_geometry else "Pérdida de Humedad"
+        ax6.set_title(humidity_title)
+        ax6.legend()
+        ax6.grid(True, alpha=0.3)
     
     def _plot_comparison_with_box(self, ax, hexagon_stats, box_stats, is_geometry):
         """Gráfico comparativo con la caja (para geometría REAL)"""
@@ -287,34 +573,16 @@ class HexagonalVisualizer:
         # Datos comparativos
         categories = ['T_max\n[°C]', 'Supervivencia\n[h]', 'Humedad\nlost [%]']
         
-        # Temperatura máxima
-        hexagon_temp = self.safe_get_value(hexagon_stats, 'max_temp_reached_celsius', 25)
-        box_temp = self.safe_get_value(box_stats, 'max_temp_reached_celsius', 25)
-        
-        # Supervivencia (manejar None apropiadamente)
-        hexagon_death_time = hexagon_stats.get('death_time_hours')
-        box_death_time = box_stats.get('death_time_hours')
-        
-        hexagon_survival = 168 if hexagon_death_time is None else hexagon_death_time
-        box_survival = 168 if box_death_time is None else box_death_time
-        
-        # Asegurar valores numéricos
-        hexagon_survival = hexagon_survival if hexagon_survival is not None else 168
-        box_survival = box_survival if box_survival is not None else 168
-        
-        # Pérdida de humedad
-        hexagon_moisture = self.safe_get_value(hexagon_stats, 'final_moisture_loss_percent', 0)
-        box_moisture = self.safe_get_value(box_stats, 'final_moisture_loss_percent', 0)
-        
-        hexagon_values = [hexagon_temp, hexagon_survival, hexagon_moisture]
-        box_values = [box_temp, box_survival, box_moisture]
-        
-        # Verificar que todos los valores son números válidos
-        for i, (hval, bval) in enumerate(zip(hexagon_values, box_values)):
-            if hval is None or not isinstance(hval, (int, float)):
-                hexagon_values[i] = 0
-            if bval is None or not isinstance(bval, (int, float)):
-                box_values[i] = 0
+        # T máxima (25 °C si falta), supervivencia (168 h si no hubo muerte) y
+        # pérdida de humedad; los valores ya son numéricos (HexStats.from_dict)
+        hexagon_values = np.nan_to_num(np.asarray(
+            [np.nan_to_num(hexagon_stats.max_temp, nan=25.0),
+             168 if hexagon_stats.death_time is None else hexagon_stats.death_time,
+             hexagon_stats.final_moisture_pct], dtype=np.float32), nan=0.0)
+        box_values = np.nan_to_num(np.asarray(
+            [np.nan_to_num(box_stats.max_temp, nan=25.0),
+             168 if box_stats.death_time is None else box_stats.death_time,
+             box_stats.final_moisture_pct], dtype=np.float32), nan=0.0)
         
         x = np.arange(len(categories))
         width = 0.35
@@ -327,12 +595,8 @@ class HexagonalVisualizer:
             bars2 = ax.bar(x + width/2, hexagon_values, width, label=hex_label, color=hex_color)
             
             # Agregar valores en las barras
-            for bars in [bars1, bars2]:
-                for bar in bars:
-                    height = bar.get_height()
-                    if height is not None and isinstance(height, (int, float)):
-                        ax.text(bar.get_x() + bar.get_width()/2., height + abs(height)*0.01,
-                               f'{height:.1f}', ha='center', va='bottom', fontsize=9)
+            ax.bar_label(bars1, fmt='%.1f', padding=2, fontsize=9)
+            ax.bar_label(bars2, fmt='%.1f', padding=2, fontsize=9)
             
             ax.set_ylabel('Valor')
             
@@ -349,18 +613,19 @@ class HexagonalVisualizer:
                    ha='center', va='center', transform=ax.transAxes)
     
     def _add_fermentation_phases(self, ax):
-        """Agrega fases de fermentación"""
-        phases = [
-            (0, 12, 'Inicial\n(Levaduras)', 'lightgreen', 0.2),
-            (12, 36, 'Fermentación\nrápida', 'yellow', 0.2),
-            (36, 84, 'Pico bacterial\n(BAA)', 'orange', 0.2),
-            (84, 168, 'Declive', 'lightcoral', 0.2)
-        ]
-        
-        for t_start, t_end, label, color, alpha in phases:
-            ax.axvspan(t_start, t_end, alpha=alpha, color=color)
+        """Agrega fases de fermentación (las 4 bandas en una sola colección)"""
+        # Bandas de altura completa, como axvspan: x en datos, y en fracción de ejes
+        bands = [[(t_start, 0), (t_start, 1), (t_end, 1), (t_end, 0)]
+                 for t_start, t_end, _, _ in _FERMENTATION_PHASES]
+        ax.add_collection(PolyCollection(bands, transform=ax.get_xaxis_transform(),
+                                         facecolors=[color for *_, color in _FERMENTATION_PHASES],
+                                         alpha=0.2),
+                          autolim=False)
+        
+        y_label = ax.get_ylim()[1]*0.90
+        for t_start, t_end, label, _ in _FERMENTATION_PHASES:
             t_center = (t_start + t_end) / 2
-            ax.text(t_center, ax.get_ylim()[1]*0.90, label, 
+            ax.text(t_center, y_label, label, 
                    ha='center', va='top', fontsize=8, fontweight='bold')
     
     def _plot_rotation_schedule(self, ax, hexagon_stats):
@@ -372,23 +637,25 @@ class HexagonalVisualizer:
         ax.axhline(y=1, color='black', linewidth=2)
         
         # Marcar rotaciones programadas
-        rotation_events = hexagon_stats.get('rotation_events_hours', [])
-        if rotation_events:
+        rotation_events = hexagon_stats.rotation_events
+        if rotation_events.size > 0:
+            # Marcas de rotación (un solo artista)
+            ax.scatter(rotation_events, np.ones_like(rotation_events), s=12**2,
+                       color='red', zorder=3)
+            
+            # Líneas verticales (una sola colección)
+            ax.vlines(rotation_events, 0, 1, transform=ax.get_xaxis_transform(),
+                      color='red', linestyle=':', alpha=0.5)
+            
             for i, rot_time in enumerate(rotation_events):
-                if rot_time is not None:
-                    # Marca de rotación
-                    ax.plot(rot_time, 1, 'o', color='red', markersize=12)
-                    ax.text(rot_time, 1.3, f'R{i+1}', ha='center', fontweight='bold')
-                    ax.text(rot_time, 0.7, f'{rot_time:.0f}h', ha='center', fontsize=9)
-                    
-                    # Línea vertical
-                    ax.axvline(x=rot_time, color='red', linestyle=':', alpha=0.5)
+                ax.text(rot_time, 1.3, f'R{i+1}', ha='center', fontweight='bold')
+                ax.text(rot_time, 0.7, f'{rot_time:.0f}h', ha='center', fontsize=9)
         
         # Etiquetas de días
+        ax.vlines(np.arange(8) * 24, 0, 1, transform=ax.get_xaxis_transform(),
+                  color='gray', linestyle='-', alpha=0.3)
         for day in range(8):
-            day_hour = day * 24
-            ax.axvline(x=day_hour, color='gray', linestyle='-', alpha=0.3)
-            ax.text(day_hour, 2, f'Día {day}', ha='center', fontsize=8)
+            ax.text(day * 24, 2, f'Día {day}', ha='center', fontsize=8)
         
         ax.set_xlabel('Tiempo [horas]')
         ax.set_title('Cronograma de Rotaciones')
@@ -407,83 +674,42 @@ class HexagonalVisualizer:
         ax.set_aspect('equal')
         ax.axis('off')
         
-        # Dibujar hexágono exterior (vista frontal)
-        angles = np.linspace(0, 2*np.pi, 7)
-        hex_outer = np.array([[0.9*np.cos(a), 0.9*np.sin(a)] for a in angles[:-1]])
-        hex_inner = np.array([[0.7*np.cos(a), 0.7*np.sin(a)] for a in angles[:-1]])
+        # Hexágonos precalculados (vista frontal)
+        hex_outer = self._hex_outer
+        hex_inner = self._hex_inner
+        
+        # Colores resueltos una vez
+        colors = self.colors
+        c_interior = colors['hexagon_interior']
+        c_vent = colors['ventilation']
         
         # Color según tipo de geometría
-        hex_color = self.colors['real_geometry'] if is_geometry else self.colors['hexagon_body']
+        hex_color = colors['real_geometry'] if is_geometry else colors['hexagon_body']
         
         # Hexágono exterior (madera)
         hex_ext_patch = Polygon(hex_outer, closed=True, 
                                facecolor=hex_color, 
-                               edgecolor='black', linewidth=2, alpha=0.8)
+                               edgecolor='black', linewidth=2, alpha=0.8, rasterized=True)
         ax.add_patch(hex_ext_patch)
         
         # Hexágono interior con distribución 70/30
         if is_geometry:
             # Mostrar distribución REAL 70/30
             # Parte inferior: cacao (70%)
-            y_cut = -0.2  # Línea de corte aproximada para 70%
-            
-            # Crear máscara para la parte inferior (cacao)
-            hex_cacao = []
-            for point in hex_inner:
-                if point[1] <= y_cut:
-                    hex_cacao.append(point)
+            y_cut = _HEX_Y_CUT
             
-            # Agregar puntos de intersección con la línea de corte
-            for i in range(len(hex_inner)):
-                p1 = hex_inner[i]
-                p2 = hex_inner[(i+1) % len(hex_inner)]
-                
-                if (p1[1] <= y_cut and p2[1] > y_cut) or (p1[1] > y_cut and p2[1] <= y_cut):
-                    # Intersección con y = y_cut
-                    t = (y_cut - p1[1]) / (p2[1] - p1[1])
-                    x_intersect = p1[0] + t * (p2[0] - p1[0])
-                    hex_cacao.append([x_intersect, y_cut])
-            
-            if len(hex_cacao) >= 3:
-                # Ordenar puntos para formar polígono
-                center = np.mean(hex_cacao, axis=0)
-                angles_sort = np.arctan2([p[1]-center[1] for p in hex_cacao], 
-                                       [p[0]-center[0] for p in hex_cacao])
-                sorted_indices = np.argsort(angles_sort)
-                hex_cacao_sorted = [hex_cacao[i] for i in sorted_indices]
-                
+            if self._hex_cacao is not None:
                 # Parte de cacao (inferior)
-                cacao_patch = Polygon(hex_cacao_sorted, closed=True, 
-                                    facecolor=self.colors['hexagon_interior'], 
-                                    edgecolor='brown', linewidth=1, alpha=0.9)
+                cacao_patch = Polygon(self._hex_cacao, closed=True, 
+                                    facecolor=c_interior, 
+                                    edgecolor='brown', linewidth=1, alpha=0.9, rasterized=True)
                 ax.add_patch(cacao_patch)
                 
-                # Parte de aire (superior) - crear máscara complementaria
-                hex_air = []
-                for point in hex_inner:
-                    if point[1] > y_cut:
-                        hex_air.append(point)
-                
-                # Agregar puntos de intersección
-                for i in range(len(hex_inner)):
-                    p1 = hex_inner[i]
-                    p2 = hex_inner[(i+1) % len(hex_inner)]
-                    
-                    if (p1[1] <= y_cut and p2[1] > y_cut) or (p1[1] > y_cut and p2[1] <= y_cut):
-                        t = (y_cut - p1[1]) / (p2[1] - p1[1])
-                        x_intersect = p1[0] + t * (p2[0] - p1[0])
-                        hex_air.append([x_intersect, y_cut])
-                
-                if len(hex_air) >= 3:
-                    center_air = np.mean(hex_air, axis=0)
-                    angles_air = np.arctan2([p[1]-center_air[1] for p in hex_air], 
-                                          [p[0]-center_air[0] for p in hex_air])
-                    sorted_indices_air = np.argsort(angles_air)
-                    hex_air_sorted = [hex_air[i] for i in sorted_indices_air]
-                    
-                    air_patch = Polygon(hex_air_sorted, closed=True, 
-                                      facecolor=self.colors['hexagon_air'], 
-                                      edgecolor='lightblue', linewidth=1, alpha=0.7)
+                # Parte de aire (superior)
+                if self._hex_air is not None:
+                    air_patch = Polygon(self._hex_air, closed=True, 
+                                      facecolor=colors['hexagon_air'], 
+                                      edgecolor='lightblue', linewidth=1, alpha=0.7, rasterized=True)
                     ax.add_patch(air_patch)
                 
                 # Línea divisoria
@@ -492,27 +718,25 @@ class HexagonalVisualizer:
         else:
             # Geometría aproximada (relleno uniforme)
             hex_int_patch = Polygon(hex_inner, closed=True, 
-                                   facecolor=self.colors['hexagon_interior'], 
-                                   edgecolor='brown', linewidth=1, alpha=0.9)
+                                   facecolor=c_interior, 
+                                   edgecolor='brown', linewidth=1, alpha=0.9, rasterized=True)
             ax.add_patch(hex_int_patch)
         
         # Marcar cara ventilada (inferior)
-        ax.plot([-0.3, 0.3], [-0.6, -0.6], color=self.colors['ventilation'], 
+        ax.plot([-0.3, 0.3], [-0.6, -0.6], color=c_vent, 
                linewidth=6, alpha=0.8, label='Ventilación 50%')
         
-        # Agregar agujeros de ventilación
-        for i in range(5):
-            x_hole = -0.3 + i * 0.15
-            y_hole = -0.6
-            circle = Circle((x_hole, y_hole), 0.03, color='black', alpha=0.8)
-            ax.add_patch(circle)
+        # Agregar agujeros de ventilación (una sola colección)
+        holes = [Circle((x_hole, -0.6), 0.03) for x_hole in -0.3 + 0.15*np.arange(5)]
+        ax.add_collection(PatchCollection(holes, facecolor='black', edgecolor='black',
+                                          alpha=0.8))
         
         # Flecha de rotación
         from matplotlib.patches import FancyArrowPatch
         arrow = FancyArrowPatch((0.8, 0.8), (0.8, -0.8),
                                connectionstyle="arc3,rad=0.3",
                                arrowstyle='->', mutation_scale=20,
-                               color=self.colors['rotation'], linewidth=3)
+                               color=colors['rotation'], linewidth=3)
         ax.add_patch(arrow)
         ax.text(1.0, 0, '🔄', fontsize=20)
         
@@ -528,11 +752,11 @@ class HexagonalVisualizer:
             ax.text(0, 0, 'Cacao\n~70%', ha='center', va='center', fontsize=10, color='white')
             
         ax.text(0, -0.9, 'Cara ventilada\n(siempre hacia abajo)', 
-               ha='center', fontsize=9, color=self.colors['ventilation'], fontweight='bold')
+               ha='center', fontsize=9, color=c_vent, fontweight='bold')
         
         # Dimensiones
-        length = self.safe_get_value(hexagon_stats, 'drum_length_m', 1.8)
-        diameter = self.safe_get_value(hexagon_stats, 'drum_diameter_m', 0.86)
+        length = hexagon_stats.drum_length
+        diameter = hexagon_stats.drum_diameter
         
         precision_note = " (exacto)" if is_geometry else " (aprox.)"
         ax.text(-1.1, -1.1, f"L = {length} m\n"
@@ -542,70 +766,73 @@ class HexagonalVisualizer:
     
     def _print_hexagonal_summary(self, hexagon_stats, box_stats=None, is_geometry=False):
         """Imprime resumen del análisis hexagonal (REAL o aproximado)"""
-        print("\n" + "="*60)
+        # Líneas acumuladas y escritas de una vez al final
+        out = ["\n" + "="*60]
         
         if is_geometry:
-            print("RESUMEN DEL TAMBOR HEXAGONAL REAL CON GMSH")
+            out.append("RESUMEN DEL TAMBOR HEXAGONAL REAL CON GMSH")
         else:
-            print("RESUMEN DEL TAMBOR HEXAGONAL")
+            out.append("RESUMEN DEL TAMBOR HEXAGONAL")
             
-        print("="*60)
+        out.append("="*60)
         
-        print(f"\nCONFIGURACIÓN:")
-        length = self.safe_get_value(hexagon_stats, 'drum_length_m', 1.8)
-        diameter = self.safe_get_value(hexagon_stats, 'drum_diameter_m', 0.86)
-        ventilation = self.safe_get_value(hexagon_stats, 'ventilated_face_fraction', 0.5)
-        total_rotations = self.safe_get_value(hexagon_stats, 'total_rotations', 0)
+        out.append("\nCONFIGURACIÓN:")
+        length = hexagon_stats.drum_length
+        diameter = hexagon_stats.drum_diameter
+        ventilation = hexagon_stats.ventilation_fraction
+        total_rotations = hexagon_stats.total_rotations
         
-        print(f"  - Longitud: {length} m")
-        print(f"  - Diámetro: {diameter} m")
-        print(f"  - Ventilación: {ventilation*100:.0f}% de una cara lateral")
-        print(f"  - Rotaciones: {total_rotations} durante fermentación")
+        out.append(f"  - Longitud: {length} m")
+        out.append(f"  - Diámetro: {diameter} m")
+        out.append(f"  - Ventilación: {ventilation*100:.0f}% de una cara lateral")
+        out.append(f"  - Rotaciones: {total_rotations} durante fermentación")
         
         if is_geometry:
-            print(f"  - Geometría: HEXÁGONO REAL 3D (GMSH)")
-            cacao_fraction = hexagon_stats.get('cacao_fraction_achieved', 0.7)
-            air_fraction = hexagon_stats.get('air_fraction_achieved', 0.3)
-            print(f"  - Distribución: {cacao_fraction*100:.0f}% cacao / {air_fraction*100:.0f}% aire (EXACTO)")
+            out.append("  - Geometría: HEXÁGONO REAL 3D (GMSH)")
+            cacao_fraction = hexagon_stats.cacao_fraction
+            air_fraction = hexagon_stats.air_fraction
+            out.append(f"  - Distribución: {cacao_fraction*100:.0f}% cacao / {air_fraction*100:.0f}% aire (EXACTO)")
         else:
-            print(f"  - Geometría: Hexágono aproximado")
-            print(f"  - Distribución: ~70% cacao / ~30% aire (aproximado)")
+            out.append("  - Geometría: Hexágono aproximado")
+            out.append("  - Distribución: ~70% cacao / ~30% aire (aproximado)")
         
-        print(f"\nRESULTADOS TÉRMICOS:")
-        max_temp = self.safe_get_value(hexagon_stats, 'max_temp_reached_celsius', 0)
-        thermal_death = hexagon_stats.get('thermal_death_occurred', False)
+        out.append("\nRESULTADOS TÉRMICOS:")
+        max_temp = float(np.nan_to_num(hexagon_stats.max_temp, nan=0.0))
+        thermal_death = hexagon_stats.thermal_death
         
-        print(f"  - Temperatura máxima: {max_temp:.1f}°C")
-        print(f"  - Muerte microbiana: {'SÍ' if thermal_death else 'NO ✓'}")
+        out.append(f"  - Temperatura máxima: {max_temp:.1f}°C")
+        out.append(f"  - Muerte microbiana: {'SÍ' if thermal_death else 'NO ✓'}")
         
         if thermal_death:
-            death_time = self.safe_get_value(hexagon_stats, 'death_time_hours', 0)
-            print(f"  - Tiempo de muerte: {death_time:.1f}h")
+            death_time = hexagon_stats.death_time or 0
+            out.append(f"  - Tiempo de muerte: {death_time:.1f}h")
         
         # Control térmico
         if max_temp < 50.0:
-            print(f"  - Control térmico: ✅ PERFECTO (<50°C)")
+            out.append("  - Control térmico: ✅ PERFECTO (<50°C)")
         elif max_temp < 55.0:
-            print(f"  - Control térmico: ✅ EXCELENTE (<55°C)")
+            out.append("  - Control térmico: ✅ EXCELENTE (<55°C)")
         else:
-            print(f"  - Control térmico: ⚠️ REVISAR (>{max_temp:.1f}°C)")
+            out.append(f"  - Control térmico: ⚠️ REVISAR (>{max_temp:.1f}°C)")
         
         # Comparación con caja (si disponible)
-        if box_stats:
-            print(f"\nCOMPARACIÓN CON CAJA:")
-            box_temp = self.safe_get_value(box_stats, 'max_temp_reached_celsius', 0)
-            print(f"  TEMPERATURA MÁXIMA:")
-            print(f"    - Caja: {box_temp:.1f}°C")
-            print(f"    - Tambor: {max_temp:.1f}°C")
+        if box_stats is not None:
+            out.append("\nCOMPARACIÓN CON CAJA:")
+            box_temp = float(np.nan_to_num(box_stats.max_temp, nan=0.0))
+            out.append("  TEMPERATURA MÁXIMA:")
+            out.append(f"    - Caja: {box_temp:.1f}°C")
+            out.append(f"    - Tambor: {max_temp:.1f}°C")
             temp_diff = max_temp - box_temp
-            print(f"    - Diferencia: {temp_diff:+.1f}°C")
+            out.append(f"    - Diferencia: {temp_diff:+.1f}°C")
             
             if is_geometry:
-                print(f"  VENTAJAS DE LA GEOMETRÍA REAL:")
-                print(f"    - Distribución exacta 70/30")
-                print(f"    - Sin aproximaciones geométricas")
-                print(f"    - Evaporación optimizada por forma real")
-                print(f"    - Control térmico preciso")
+                out.append("  VENTAJAS DE LA GEOMETRÍA REAL:")
+                out.append("    - Distribución exacta 70/30")
+                out.append("    - Sin aproximaciones geométricas")
+                out.append("    - Evaporación optimizada por forma real")
+                out.append("    - Control térmico preciso")
+        
+        sys.stdout.write("\n".join(out) + "\n")
 
 
 def main():